@@ -1,19 +1,11 @@
 import streamlit as st
-from db import load_all_data
 import auth as auth
 import componentes as ui
 # 1. Configuración e Inicialización
 st.set_page_config(page_title="OKR Enterprise System")
 auth.init_session()
 
-# 2. Carga de datos (silenciosa para el login)
-try:
-    empleados, okrs, tareas, areas= load_all_data()
-except Exception as e:
-    st.error("Error al conectar con la base de datos.")
-    st.stop()
-
-# 3. Router de Vistas
+# 2. Router de Vistas
 if not st.session_state.authenticated:
     # --- VISTA DE LOGIN ---
     st.container()
@@ -28,7 +20,12 @@ if not st.session_state.authenticated:
         submit = st.form_submit_button("Iniciar Sesión", use_container_width=True)
         
         if submit:
-            user_found = auth.check_credentials(empleados, email, password)
+            # Solo se consulta la fila de ese email; los datos se cargan tras autenticar
+            try:
+                user_found = auth.check_credentials(email, password)
+            except Exception as e:
+                st.error("Error al conectar con la base de datos.")
+                st.stop()
             if user_found is not None:
                 auth.login(user_found)
             else:
@@ -47,8 +44,11 @@ else:
         if st.button("Cerrar Sesión"):
             auth.logout()
 
+    # 3. Cada sección carga en el snapshot compartido solo las tablas que declara
+    # (ver componentes.render_secciones); aquí no se carga nada por adelantado.
+
     # Router por Rol
     if user['rol'].lower() == "manager":
-        ui.render_manager_view(empleados, okrs, tareas, areas)
+        ui.render_manager_view()
     else:
-        ui.render_employee_view(user, okrs, tareas)
\ No newline at end of file
+        ui.render_employee_view(user)
\ No newline at end of file
@@ -1,4 +1,35 @@
 import streamlit as st
+import hashlib
+import hmac
+import secrets
+from db import load_credencial, update_password
+
+# --- CONTRASEÑAS ---
+# Formato guardado en empleados.password: pbkdf2_sha256$iteraciones$sal$hash
+ALGORITMO_HASH = "pbkdf2_sha256"
+ITERACIONES_HASH = 310000
+# Contraseñas temporales de la importación masiva: con 310000 iteraciones, 10k
+# altas serían ~30 min solo de hash. Se refuerzan en el primer login.
+ITERACIONES_TEMPORAL = 10000
+
+def hash_password(password, sal=None, iteraciones=ITERACIONES_HASH):
+    sal = sal or secrets.token_hex(16)
+    derivada = hashlib.pbkdf2_hmac("sha256", str(password).encode(), bytes.fromhex(sal), iteraciones)
+    return f"{ALGORITMO_HASH}${iteraciones}${sal}${derivada.hex()}"
+
+def es_hash(valor):
+    return str(valor).startswith(ALGORITMO_HASH + "$")
+
+def necesita_rehash(almacenada):
+    """En claro o con menos iteraciones de las actuales."""
+    return not es_hash(almacenada) or int(str(almacenada).split("$")[1]) < ITERACIONES_HASH
+
+def verificar_password(password, almacenada):
+    """Compara en tiempo constante. Acepta aún passwords antiguas en claro."""
+    if not es_hash(almacenada):
+        return hmac.compare_digest(str(password).encode(), str(almacenada).encode())
+    _, iteraciones, sal, _ = str(almacenada).split("$")
+    return hmac.compare_digest(hash_password(password, sal, int(iteraciones)), str(almacenada))
 
 def init_session():
     """Inicializa las variables de estado si no existen."""
@@ -6,19 +37,16 @@ def init_session():
         st.session_state.authenticated = False
         st.session_state.user = None
 
-def check_credentials(df_empleados, email_input, pass_input):
-    """Valida email y password contra el dataframe."""
-    # Buscamos el usuario por email
-    if df_empleados.empty:
-        return None
-    else: 
-        user_match = df_empleados[df_empleados["email"] == email_input]
-        if not user_match.empty:
-            # Verificamos la password (case sensitive)
-            stored_pass = str(user_match.iloc[0]["password"])
-            if str(pass_input) == stored_pass:
-                return user_match.iloc[0] # Retorna la fila del usuario
+def check_credentials(email_input, pass_input):
+    """Valida email y password leyendo solo la fila de ese email."""
+    fila = load_credencial(email_input)
+    if fila is None or not verificar_password(pass_input, fila["password"]):
         return None
+    if necesita_rehash(fila["password"]):
+        # Migración transparente: la primera vez que entra se guarda el hash completo
+        update_password(fila["id"], hash_password(pass_input))
+    # El usuario de la sesión no conserva la password
+    return {k: v for k, v in fila.items() if k != "password"}
 
 def login(user_data):
     st.session_state.authenticated = True
@@ -28,4 +56,7 @@ def login(user_data):
 def logout():
     st.session_state.authenticated = False
     st.session_state.user = None
-    st.rerun()
\ No newline at end of file
+    # Los datos en runtime son del usuario anterior (otro rol, otro alcance)
+    for k in [k for k in st.session_state.keys() if k.endswith("_runtime")]:
+        del st.session_state[k]
+    st.rerun()
@@ -0,0 +1,285 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from metricas import medir_tabla
+from variables import tablaAreas, tablaEmpleados, tablaOkrs, tablaTareas, tablaEliminados
+
+# --- BACKENDS DE ALMACENAMIENTO ---
+# db.py solo habla con esta interfaz. Filtros: tuplas (metodo, columna, valor)
+# con metodo "eq", "in_" o "gte" (ver db.leer_paginado); orden: una o varias
+# columnas separadas por comas ("updated_at, id"). Todas las operaciones
+# devuelven la lista de filas afectadas, como PostgREST.
+#   * SupabaseBackend: el de producción.
+#   * SqliteBackend: todo en un fichero local (pruebas y demos sin conexión).
+#   * ReplicaBackend: lee de una réplica local y escribe en el principal.
+
+class Backend:
+    def leer(self, tabla, columnas="*", filtros=(), orden="id", inicio=0, limite=None):
+        raise NotImplementedError
+
+    def insertar(self, tabla, filas):
+        raise NotImplementedError
+
+    def upsert(self, tabla, filas, on_conflict="id"):
+        raise NotImplementedError
+
+    def actualizar(self, tabla, datos, filtros):
+        raise NotImplementedError
+
+    def borrar(self, tabla, filtros):
+        raise NotImplementedError
+
+
+def _columnas_orden(orden):
+    return [c.strip() for c in orden.split(",")]
+
+def _aplicar_filtros(query, filtros):
+    for metodo, columna, valor in filtros:
+        query = getattr(query, metodo)(columna, list(valor) if metodo == "in_" else valor)
+    return query
+
+
+class SupabaseBackend(Backend):
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    def _tabla(self, tabla):
+        # Con métricas activas cada execute() queda registrado (metricas.py)
+        return medir_tabla(self.cliente.table(tabla), tabla)
+
+    def leer(self, tabla, columnas="*", filtros=(), orden="id", inicio=0, limite=None):
+        query = _aplicar_filtros(self._tabla(tabla).select(columnas), filtros)
+        for columna in _columnas_orden(orden):
+            query = query.order(columna)
+        if limite is not None:
+            query = query.range(inicio, inicio + limite - 1)
+        return query.execute().data
+
+    def insertar(self, tabla, filas):
+        return self._tabla(tabla).insert(filas).execute().data
+
+    def upsert(self, tabla, filas, on_conflict="id"):
+        return self._tabla(tabla).upsert(filas, on_conflict=on_conflict).execute().data
+
+    def actualizar(self, tabla, datos, filtros):
+        return _aplicar_filtros(self._tabla(tabla).update(datos), filtros).execute().data
+
+    def borrar(self, tabla, filtros):
+        return _aplicar_filtros(self._tabla(tabla).delete(), filtros).execute().data
+
+
+# --- SQLITE ---
+# Mismo esquema que Supabase, incluidas updated_at y las lápidas de
+# "eliminados" (sql/sincronizacion.sql), para que la sincronización incremental
+# funcione igual contra los dos.
+ESQUEMA_SQLITE = f"""
+create table if not exists {tablaAreas} (
+    id integer primary key autoincrement, nombre text, updated_at text);
+create table if not exists {tablaEmpleados} (
+    id integer primary key autoincrement, nombre text, email text unique, password text,
+    rol text, area text, updated_at text);
+create table if not exists {tablaOkrs} (
+    id integer primary key autoincrement, nombre text, descripcion text, tipo text,
+    id_empleado integer, link_org integer, anio integer, estado text, updated_at text);
+create table if not exists {tablaTareas} (
+    id integer primary key autoincrement, nombre text, estado text, link_okr integer,
+    id_empleado integer, updated_at text);
+create table if not exists {tablaEliminados} (
+    tabla text not null, id integer not null, deleted_at text not null);
+create table if not exists sync_replica (
+    tabla text primary key, marca text not null);
+create index if not exists okrs_id_empleado on {tablaOkrs} (id_empleado);
+create index if not exists tareas_link_okr on {tablaTareas} (link_okr);
+create index if not exists eliminados_tabla_deleted_at on {tablaEliminados} (tabla, deleted_at);
+"""
+TABLAS_SQLITE = (tablaAreas, tablaEmpleados, tablaOkrs, tablaTareas)
+
+def _ahora():
+    return datetime.now(timezone.utc).isoformat()
+
+def _columnas_sql(columnas):
+    if columnas.strip() == "*":
+        return "*"
+    return ", ".join(f'"{c.strip()}"' for c in columnas.split(","))
+
+def _where(filtros):
+    condiciones, parametros = [], []
+    for metodo, columna, valor in filtros:
+        if metodo == "eq":
+            condiciones.append(f'"{columna}" = ?')
+            parametros.append(valor)
+        elif metodo == "gte":
+            condiciones.append(f'"{columna}" >= ?')
+            parametros.append(valor)
+        elif metodo == "in_":
+            valores = list(valor)
+            condiciones.append(f'"{columna}" in ({", ".join("?" * len(valores))})' if valores else "0")
+            parametros += valores
+        else:
+            raise ValueError(f"Filtro no soportado: {metodo}")
+    return (" where " + " and ".join(condiciones) if condiciones else ""), parametros
+
+
+class SqliteBackend(Backend):
+    def __init__(self, ruta=":memory:"):
+        # Una conexión compartida por los hilos de Streamlit, serializada con un lock
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self.conexion.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        with self.lock, self.conexion:
+            self.conexion.executescript(ESQUEMA_SQLITE)
+
+    def _consulta(self, sql, parametros=()):
+        return [dict(fila) for fila in self.conexion.execute(sql, parametros).fetchall()]
+
+    def leer(self, tabla, columnas="*", filtros=(), orden="id", inicio=0, limite=None):
+        where, parametros = _where(filtros)
+        orden_sql = ", ".join(f'"{c}"' for c in _columnas_orden(orden))
+        sql = f'select {_columnas_sql(columnas)} from "{tabla}"{where} order by {orden_sql}'
+        if limite is not None:
+            sql += f" limit {int(limite)} offset {int(inicio)}"
+        with self.lock:
+            return self._consulta(sql, parametros)
+
+    def _escribir_filas(self, tabla, filas, on_conflict=None, conservar_marca=False):
+        filas = filas if isinstance(filas, list) else [filas]
+        afectadas = []
+        with self.lock, self.conexion:
+            for fila in filas:
+                # Como el trigger de Supabase: updated_at lo pone la base de datos
+                fila = {**fila, "updated_at": fila.get("updated_at") if conservar_marca else _ahora()}
+                columnas = ", ".join(f'"{c}"' for c in fila)
+                sql = f'insert into "{tabla}" ({columnas}) values ({", ".join("?" * len(fila))})'
+                if on_conflict:
+                    sets = ", ".join(f'"{c}" = excluded."{c}"' for c in fila if c != on_conflict)
+                    sql += f' on conflict ("{on_conflict}") do update set {sets}'
+                afectadas += self._consulta(sql + " returning *", list(fila.values()))
+        return afectadas
+
+    def insertar(self, tabla, filas):
+        return self._escribir_filas(tabla, filas)
+
+    def upsert(self, tabla, filas, on_conflict="id"):
+        return self._escribir_filas(tabla, filas, on_conflict)
+
+    def actualizar(self, tabla, datos, filtros):
+        datos = {**datos, "updated_at": _ahora()}
+        where, parametros = _where(filtros)
+        sets = ", ".join(f'"{c}" = ?' for c in datos)
+        with self.lock, self.conexion:
+            return self._consulta(f'update "{tabla}" set {sets}{where} returning *', list(datos.values()) + parametros)
+
+    def borrar(self, tabla, filtros):
+        where, parametros = _where(filtros)
+        with self.lock, self.conexion:
+            borradas = self._consulta(f'delete from "{tabla}"{where} returning *', parametros)
+            if tabla != tablaEliminados:
+                ahora = _ahora()
+                self.conexion.executemany(
+                    f'insert into "{tablaEliminados}" (tabla, id, deleted_at) values (?, ?, ?)',
+                    [(tabla, fila["id"], ahora) for fila in borradas])
+        return borradas
+
+    def marca_sync(self, tabla):
+        """Hasta dónde se sincronizó `tabla` desde el principal (solo réplicas)."""
+        with self.lock:
+            fila = self.conexion.execute("select marca from sync_replica where tabla = ?", (tabla,)).fetchone()
+            return fila[0] if fila else None
+
+    def guardar_marca_sync(self, tabla, marca):
+        with self.lock, self.conexion:
+            self.conexion.execute(
+                "insert into sync_replica (tabla, marca) values (?, ?) "
+                "on conflict (tabla) do update set marca = excluded.marca", (tabla, marca))
+
+    def copiar(self, tabla, filas):
+        """Upsert que conserva el updated_at de origen (filas venidas de otro backend);
+        las columnas que la tabla local no tiene se ignoran."""
+        columnas = set(self.columnas(tabla))
+        filas = [{c: v for c, v in fila.items() if c in columnas} for fila in filas]
+        return self._escribir_filas(tabla, filas, "id", conservar_marca=True)
+
+    def importar(self, tabla, filas):
+        """Reemplaza el contenido de la tabla tal cual (ids y updated_at incluidos)."""
+        columnas = self.columnas(tabla)
+        with self.lock, self.conexion:
+            self.conexion.execute(f'delete from "{tabla}"')
+            self.conexion.executemany(
+                f'insert into "{tabla}" ({", ".join(columnas)}) values ({", ".join("?" * len(columnas))})',
+                [tuple(fila.get(c) for c in columnas) for fila in filas])
+
+    def columnas(self, tabla):
+        with self.lock:
+            return [fila[1] for fila in self.conexion.execute(f'pragma table_info("{tabla}")')]
+
+
+# --- RÉPLICA DE LECTURA ---
+MARGEN_REPLICA = timedelta(seconds=5)
+
+class ReplicaBackend(Backend):
+    """Lecturas contra la réplica local; escrituras contra el principal y,
+    confirmadas, se copian a la réplica con las filas que devuelve."""
+    PAGINA = 1000
+
+    def __init__(self, principal, replica):
+        self.principal = principal
+        self.replica = replica
+
+    def _leer_todo(self, tabla, filtros=(), orden="id"):
+        filas, inicio = [], 0
+        while True:
+            pagina = self.principal.leer(tabla, "*", filtros, orden, inicio, self.PAGINA)
+            filas += pagina
+            if len(pagina) < self.PAGINA:
+                return filas
+            inicio += self.PAGINA
+
+    def sincronizar(self, tablas=TABLAS_SQLITE):
+        """Trae del principal lo cambiado o borrado desde la última sincronización
+        (con el mismo solape que db.MARGEN_SYNC)."""
+        # La marca es propia de la sincronización, como snapshot.marcas: el
+        # max(updated_at) de la réplica no sirve, porque las escrituras hechas a
+        # través de la réplica lo adelantan sin haber traído lo anterior del principal
+        for tabla in tablas:
+            marca = self.replica.marca_sync(tabla)
+            if marca is None:
+                filas = self._leer_todo(tabla)
+                self.replica.importar(tabla, filas)
+                marcas = [f["updated_at"] for f in filas]
+            else:
+                desde = (datetime.fromisoformat(marca) - MARGEN_REPLICA).isoformat()
+                # Con id como desempate: un mismo statement deja muchas filas con el mismo
+                # updated_at y sin él el orden entre páginas no es estable
+                filas = self._copiar(tabla, self._leer_todo(tabla, (("gte", "updated_at", desde),), "updated_at, id"))
+                borrados = self._leer_todo(tablaEliminados, (("eq", "tabla", tabla), ("gte", "deleted_at", desde)), "deleted_at, id")
+                ids = [b["id"] for b in borrados]
+                if ids:
+                    self.replica.borrar(tabla, (("in_", "id", ids),))
+                marcas = [marca] + [f["updated_at"] for f in filas] + [b["deleted_at"] for b in borrados]
+            marcas = [m for m in marcas if m]
+            if marcas:
+                self.replica.guardar_marca_sync(tabla, max(marcas, key=datetime.fromisoformat))
+
+    def leer(self, tabla, columnas="*", filtros=(), orden="id", inicio=0, limite=None):
+        return self.replica.leer(tabla, columnas, filtros, orden, inicio, limite)
+
+    def _copiar(self, tabla, filas):
+        if filas:
+            self.replica.copiar(tabla, filas)
+        return filas
+
+    def insertar(self, tabla, filas):
+        return self._copiar(tabla, self.principal.insertar(tabla, filas))
+
+    def upsert(self, tabla, filas, on_conflict="id"):
+        return self._copiar(tabla, self.principal.upsert(tabla, filas, on_conflict))
+
+    def actualizar(self, tabla, datos, filtros):
+        return self._copiar(tabla, self.principal.actualizar(tabla, datos, filtros))
+
+    def borrar(self, tabla, filtros):
+        borradas = self.principal.borrar(tabla, filtros)
+        ids = [fila["id"] for fila in borradas if fila.get("id") is not None]
+        if ids:
+            self.replica.borrar(tabla, (("in_", "id", ids),))
+        return borradas
@@ -0,0 +1,2 @@
+# Benchmarks de los caminos calientes (carga, progreso, login, guardado masivo)
+# sobre datos sintéticos y un Supabase en memoria. Uso: python -m benchmarks --help
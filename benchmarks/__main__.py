@@ -0,0 +1,186 @@
+import argparse
+import io
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+import auth
+import db
+from componentes import calcular_progreso_empleado
+from okr_store import OkrStore
+from busqueda import IndiceEmpleados
+from importacion import COLUMNAS_IMPORTACION, ORDEN_IMPORTACION, Importacion, leer_archivo
+from progreso import AgregadosProgreso, progreso_por_okr, progreso_por_empleado
+from variables import tablaEmpleados, tablaOkrs, tablaTareas, tablaAreas
+from benchmarks.datos import generar
+from benchmarks.supabase_local import ClienteLocal
+from backends import SupabaseBackend, SqliteBackend
+
+# --- BENCHMARKS ---
+# python -m benchmarks --escalas 10 1000 10000 100000 --salida bench.json
+# El JSON lleva el commit para poder comparar resultados entre versiones.
+ESCALAS = (10, 1000, 10000)
+REPETICIONES = 3
+MAX_FILAS_EDITADAS = 5000
+TABLAS = (tablaEmpleados, tablaOkrs, tablaTareas, tablaAreas)
+
+def medir(fn, repeticiones, preparar=None):
+    tiempos = []
+    for _ in range(repeticiones):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - inicio)
+    return {"min": min(tiempos), "mediana": statistics.median(tiempos), "repeticiones": repeticiones}
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+def _csv_importacion(datos):
+    """La organización de `datos` como los CSV de importacion.py: referencias por
+    nombre/email en lugar de ids, y una contraseña temporal común."""
+    email_de = {e["id"]: e["email"] for e in datos[tablaEmpleados]}
+    nombre_okr = {o["id"]: o["nombre"] for o in datos[tablaOkrs]}
+    empleados = pd.DataFrame(datos[tablaEmpleados]).assign(password="Temporal1")
+    okrs = pd.DataFrame(datos[tablaOkrs])
+    okrs = okrs.assign(email=okrs["id_empleado"].map(email_de), link_org=okrs["link_org"].map(nombre_okr))
+    tareas = pd.DataFrame(datos[tablaTareas])
+    tareas = tareas.assign(email=tareas["id_empleado"].map(email_de), link_okr=tareas["link_okr"].map(nombre_okr))
+    frames = {tablaAreas: pd.DataFrame(datos[tablaAreas]), tablaEmpleados: empleados, tablaOkrs: okrs, tablaTareas: tareas}
+    return {t: frames[t][COLUMNAS_IMPORTACION[t]].to_csv(index=False).encode() for t in ORDEN_IMPORTACION}
+
+@contextmanager
+def _con_backend(backend):
+    """db.get_backend devuelve `backend` solo dentro del with."""
+    original = db.get_backend
+    db.get_backend = lambda: backend
+    try:
+        yield backend
+    finally:
+        db.get_backend = original
+
+def _importar_organizacion(archivos):
+    with _con_backend(SqliteBackend()):
+        importacion = Importacion({})
+        for tabla, contenido in archivos.items():
+            for _, filas, total in leer_archivo(io.BytesIO(contenido), f"{tabla}.csv", tabla):
+                importacion.importar(tabla, filas, total)
+
+def correr_escala(n_empleados, repeticiones, semilla, backend="supabase"):
+    datos = generar(n_empleados, semilla)
+    if backend == "sqlite":
+        cliente = SqliteBackend()
+        for tabla, filas in datos.items():
+            cliente.importar(tabla, filas)
+        almacen = cliente
+    else:
+        cliente = ClienteLocal(datos)
+        almacen = SupabaseBackend(cliente)
+    with _con_backend(almacen):
+        resultados = _medir_escala(datos, repeticiones)
+    if backend != "sqlite":
+        resultados["llamadas_supabase"] = cliente.llamadas
+    return resultados
+
+def _medir_escala(datos, repeticiones):
+    anio = max(okr["anio"] for okr in datos[tablaOkrs])
+
+    resultados = {"filas": {t: len(f) for t, f in datos.items()}}
+    # Carga en frío del snapshot (snapshot._cargar sin caché en disco): lectura paginada + esquema
+    resultados["carga_completa"] = medir(
+        lambda: [db.aplicar_esquema(t, db.leer_paginado(t, db.COLUMNAS_TABLA[t])) for t in TABLAS], repeticiones)
+
+    crudos = {t: pd.DataFrame(datos[t]) for t in TABLAS}
+    # Normalización de IDs/tipos (antes se hacía en render_manager_dashboard) e índice del store
+    # aplicar_esquema cambia el frame que recibe: cada repetición tipa una copia sin tocar
+    copias = {}
+    resultados["aplicar_esquema"] = medir(
+        lambda: [db.aplicar_esquema(t, df) for t, df in copias.items()], repeticiones,
+        preparar=lambda: copias.update({t: df.copy() for t, df in crudos.items()}))
+    tablas = {t: db.aplicar_esquema(t, df.copy()) for t, df in crudos.items()}
+    resultados["okr_store"] = medir(
+        lambda: OkrStore(*(tablas[t] for t in TABLAS)), repeticiones)
+
+    indice = IndiceEmpleados(tablas[tablaEmpleados])
+    empleado = datos[tablaEmpleados][len(datos[tablaEmpleados]) // 3]
+    apellido = empleado["nombre"].split()[1].lower()
+    resultados["busqueda_indice"] = medir(lambda: IndiceEmpleados(tablas[tablaEmpleados]), repeticiones)
+    resultados["busqueda_email"] = medir(lambda: indice.buscar_filas(empleado["email"].split("@")[0]), repeticiones)
+    resultados["busqueda_nombre_apellido"] = medir(
+        lambda: indice.buscar_filas(f"{empleado['nombre'].split()[0]} {apellido[:3]}", limite=50), repeticiones)
+
+    okrs, tareas = tablas[tablaOkrs], tablas[tablaTareas]
+    resultados["progreso_por_okr"] = medir(lambda: progreso_por_okr(okrs, tareas), repeticiones)
+    okrs_anio = okrs[(okrs["anio"] == anio) & (okrs["tipo"] == "Empleado")]
+    resultados["progreso_equipo"] = medir(
+        lambda: progreso_por_empleado(progreso_por_okr(okrs_anio, tareas)), repeticiones)
+    resultados["agregados_desde_tablas"] = medir(lambda: AgregadosProgreso.desde_tablas(okrs, tareas), repeticiones)
+    agregados = AgregadosProgreso.desde_tablas(okrs, tareas)
+    id_tarea = int(tareas["id"].iloc[0])
+    # Lo que hace snapshot.publicar con una tarea: copia perezosa + delta
+    resultados["agregados_con_tarea"] = medir(
+        lambda: agregados.con(tablaTareas, [{"id": id_tarea, "estado": "Hecho"}]), repeticiones)
+    id_empleado = datos[tablaEmpleados][len(datos[tablaEmpleados]) // 2]["id"]
+    okrs_emp = okrs[okrs["id_empleado"] == id_empleado]
+    resultados["calcular_progreso_empleado"] = medir(
+        lambda: calcular_progreso_empleado(okrs_emp, tareas), repeticiones)
+
+    # Login: la primera llamada migra la password en claro a hash; se mide el camino con hash
+    email, password = f"empleado{id_empleado}@bench.local", f"clave{id_empleado}"
+    auth.check_credentials(email, password)
+    resultados["check_credentials"] = medir(lambda: auth.check_credentials(email, password), repeticiones)
+
+    n_editadas = min(len(tareas), MAX_FILAS_EDITADAS)
+    cambios = {"edited_rows": {pos: {"estado": "Hecho"} for pos in range(n_editadas)}}
+    resultados["update_database_from_editor"] = medir(
+        lambda: db.update_database_from_editor(tablaTareas, cambios, original=tareas), repeticiones)
+    resultados["update_database_from_editor"]["filas"] = n_editadas
+
+    # Alta masiva de toda la organización (CSV) sobre un SQLite vacío
+    archivos = _csv_importacion(datos)
+    resultados["importacion_csv"] = medir(lambda: _importar_organizacion(archivos), repeticiones)
+    resultados["importacion_csv"]["filas"] = sum(len(datos[t]) for t in ORDEN_IMPORTACION)
+    return resultados
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks sobre datos sintéticos y Supabase en memoria")
+    parser.add_argument("--escalas", type=int, nargs="+", default=list(ESCALAS), help="número de empleados")
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--backend", choices=["supabase", "sqlite"], default="supabase",
+                        help="supabase: API de tablas en memoria; sqlite: backends.SqliteBackend en memoria")
+    parser.add_argument("--salida", default="bench.json")
+    args = parser.parse_args()
+    # Fuera de `streamlit run` cada caché avisa de que no hay runtime
+    for nombre in [n for n in logging.root.manager.loggerDict if n.startswith("streamlit")]:
+        logging.getLogger(nombre).setLevel(logging.ERROR)
+
+    informe = {
+        "commit": _commit(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "semilla": args.semilla,
+        "backend": args.backend,
+        "escalas": {},
+    }
+    for n in args.escalas:
+        print(f"· {n} empleados...", flush=True)
+        informe["escalas"][str(n)] = correr_escala(n, args.repeticiones, args.semilla, args.backend)
+    with open(args.salida, "w") as f:
+        json.dump(informe, f, indent=2)
+    print(f"Resultados en {args.salida}")
+
+if __name__ == "__main__":
+    main()
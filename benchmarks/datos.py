@@ -0,0 +1,65 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+# --- GENERADOR DE DATOS SINTÉTICOS ---
+# Filas con la misma forma que devuelve Supabase (listas de dicts), con
+# semilla fija para que dos commits se midan sobre exactamente los mismos datos.
+EMPLEADOS_POR_AREA = 40
+CORPORATIVOS_POR_ANIO = 5
+OKRS_POR_ANIO = 2
+TAREAS_POR_OKR = 3
+ANIOS = (2025, 2026)
+ESTADOS_OKR = ["Nuevo", "Incompleto", "Completo"]
+ESTADOS_TAREA = ["Pendiente", "Haciendo", "Hecho"]
+NOMBRES = ["Ana", "Juan", "María", "José", "Lucía", "Pedro", "Sofía", "Andrés", "Valentina", "Martín"]
+APELLIDOS = ["García", "Pérez", "Rodríguez", "López", "Fernández", "Gómez", "Díaz", "Muñoz", "Álvarez", "Núñez"]
+
+def generar(n_empleados, semilla=42):
+    """{tabla: [filas]} para `n_empleados` empleados (más un manager)."""
+    rnd = random.Random(semilla)
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    def marca():
+        return (base + timedelta(seconds=rnd.randrange(86400 * 300))).isoformat()
+
+    n_areas = max(1, n_empleados // EMPLEADOS_POR_AREA)
+    areas = [{"id": i, "nombre": f"Área {i}", "updated_at": marca()} for i in range(1, n_areas + 1)]
+
+    empleados = [{"id": 1, "nombre": "Manager Demo", "email": "manager@bench.local", "password": "manager123",
+                  "rol": "manager", "area": areas[0]["nombre"], "updated_at": marca()}]
+    for i in range(2, n_empleados + 2):
+        empleados.append({
+            "id": i,
+            "nombre": f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}",
+            "email": f"empleado{i}@bench.local",
+            "password": f"clave{i}",
+            "rol": "empleado",
+            "area": rnd.choice(areas)["nombre"],
+            "updated_at": marca(),
+        })
+
+    okrs, tareas = [], []
+    corporativos = {}
+    for anio in ANIOS:
+        corporativos[anio] = []
+        for _ in range(CORPORATIVOS_POR_ANIO):
+            okr = {"id": len(okrs) + 1, "nombre": f"Objetivo empresa {len(okrs) + 1}", "descripcion": "Corporativo",
+                   "tipo": "Organizacion", "id_empleado": None, "link_org": None, "anio": anio,
+                   "estado": rnd.choice(ESTADOS_OKR), "updated_at": marca()}
+            okrs.append(okr)
+            corporativos[anio].append(okr["id"])
+
+    for emp in empleados[1:]:
+        for anio in ANIOS:
+            for _ in range(OKRS_POR_ANIO):
+                id_okr = len(okrs) + 1
+                okrs.append({"id": id_okr, "nombre": f"OKR {id_okr}", "descripcion": "Objetivo personal",
+                             "tipo": "Empleado", "id_empleado": emp["id"],
+                             "link_org": rnd.choice(corporativos[anio]) if rnd.random() < 0.7 else None,
+                             "anio": anio, "estado": rnd.choice(ESTADOS_OKR), "updated_at": marca()})
+                for _ in range(rnd.randint(0, 2 * TAREAS_POR_OKR)):
+                    tareas.append({"id": len(tareas) + 1, "nombre": f"Tarea {len(tareas) + 1}",
+                                   "estado": rnd.choice(ESTADOS_TAREA), "link_okr": id_okr,
+                                   "id_empleado": emp["id"], "updated_at": marca()})
+
+    return {"areas": areas, "empleados": empleados, "okrs": okrs, "tareas": tareas, "eliminados": []}
@@ -0,0 +1,136 @@
+import copy
+from datetime import datetime, timezone
+
+# --- SUPABASE EN MEMORIA ---
+# Implementa la parte de la API de tablas de supabase-py que usa db.py
+# (select/eq/in_/gte/order/range/limit y insert/upsert/update/delete + execute).
+
+class _Respuesta:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Consulta:
+    def __init__(self, cliente, tabla):
+        self.cliente = cliente
+        self.tabla = tabla
+        self.filas = cliente.tablas.setdefault(tabla, [])
+        self.operacion = "select"
+        self.columnas = None
+        self.filtros = []
+        self.orden = []
+        self.ventana = None
+        self.datos = None
+        self.on_conflict = "id"
+
+    # --- lectura ---
+    def select(self, columnas="*"):
+        self.columnas = None if columnas.strip() == "*" else [c.strip() for c in columnas.split(",")]
+        return self
+
+    def eq(self, columna, valor):
+        self.filtros.append(lambda f: f.get(columna) == valor)
+        return self
+
+    def in_(self, columna, valores):
+        valores = set(valores)
+        self.filtros.append(lambda f: f.get(columna) in valores)
+        return self
+
+    def gte(self, columna, valor):
+        self.filtros.append(lambda f: f.get(columna) is not None and str(f.get(columna)) >= str(valor))
+        return self
+
+    def order(self, columna, desc=False):
+        self.orden.append((columna, desc))
+        return self
+
+    def range(self, inicio, fin):
+        self.ventana = (inicio, fin + 1)
+        return self
+
+    def limit(self, n):
+        self.ventana = (0, n)
+        return self
+
+    # --- escritura ---
+    def insert(self, datos):
+        self.operacion, self.datos = "insert", datos
+        return self
+
+    def upsert(self, datos, on_conflict="id"):
+        self.operacion, self.datos, self.on_conflict = "upsert", datos, on_conflict
+        return self
+
+    def update(self, datos):
+        self.operacion, self.datos = "update", datos
+        return self
+
+    def delete(self):
+        self.operacion = "delete"
+        return self
+
+    def _coinciden(self):
+        return [f for f in self.filas if all(filtro(f) for filtro in self.filtros)]
+
+    def _proyectar(self, filas):
+        if self.columnas is None:
+            return [dict(f) for f in filas]
+        return [{c: f.get(c) for c in self.columnas} for f in filas]
+
+    def execute(self):
+        self.cliente.llamadas += 1
+        ahora = datetime.now(timezone.utc).isoformat()
+        if self.operacion == "select":
+            filas = self._coinciden()
+            # Orden estable de la última a la primera columna: queda ordenado por todas
+            for columna, desc in reversed(self.orden):
+                filas = sorted(filas, key=lambda f: (f.get(columna) is None, f.get(columna)), reverse=desc)
+            if self.ventana:
+                filas = filas[self.ventana[0]:self.ventana[1]]
+            return _Respuesta(self._proyectar(filas))
+
+        if self.operacion in ("insert", "upsert"):
+            nuevas = self.datos if isinstance(self.datos, list) else [self.datos]
+            indice = {f.get(self.on_conflict): f for f in self.filas}
+            afectadas = []
+            for datos in copy.deepcopy(nuevas):
+                existente = indice.get(datos.get(self.on_conflict)) if self.operacion == "upsert" else None
+                if existente is not None:
+                    existente.update(datos, updated_at=ahora)
+                    afectadas.append(dict(existente))
+                    continue
+                datos.setdefault("id", self.cliente.siguiente_id(self.tabla))
+                datos["updated_at"] = ahora
+                self.filas.append(datos)
+                indice[datos.get(self.on_conflict)] = datos
+                afectadas.append(dict(datos))
+            return _Respuesta(afectadas)
+
+        afectadas = self._coinciden()
+        if self.operacion == "update":
+            for f in afectadas:
+                f.update(self.datos, updated_at=ahora)
+        else:
+            ids = {id(f) for f in afectadas}
+            self.filas[:] = [f for f in self.filas if id(f) not in ids]
+            self.cliente.tablas.setdefault("eliminados", []).extend(
+                {"tabla": self.tabla, "id": f.get("id"), "deleted_at": ahora} for f in afectadas)
+        return _Respuesta([dict(f) for f in afectadas])
+
+
+class ClienteLocal:
+    """Sustituto de supabase.Client sobre {tabla: [filas]} en memoria."""
+    def __init__(self, tablas):
+        self.tablas = {t: [dict(f) for f in filas] for t, filas in tablas.items()}
+        self.llamadas = 0
+        self._ultimo_id = {}
+
+    def table(self, tabla):
+        return _Consulta(self, tabla)
+
+    def siguiente_id(self, tabla):
+        if tabla not in self._ultimo_id:
+            self._ultimo_id[tabla] = max((f.get("id") or 0 for f in self.tablas.get(tabla, [])), default=0)
+        self._ultimo_id[tabla] += 1
+        return self._ultimo_id[tabla]
@@ -0,0 +1,158 @@
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right
+import numpy as np
+import pandas as pd
+
+# --- ÍNDICE DE BÚSQUEDA DE EMPLEADOS ---
+# Se construye entero una vez por snapshot (OkrStore.busqueda), la primera vez
+# que alguien busca. Nombre y parte local del email se pliegan (minúsculas, sin
+# tildes) y se parten en tokens:
+#   * prefijos: vocabulario ordenado + bisect -> "per" encuentra "Pérez"; cada
+#     token del vocabulario apunta a un tramo de un array de filas (CSR)
+#   * trigramas: si ningún token casa, se buscan nombres parecidos ("perz")
+# Los nombres se pliegan una vez por nombre distinto, no por fila, y los
+# trigramas se indexan sobre esos nombres distintos.
+# Los resultados salen ordenados por relevancia y, a igual relevancia, por nombre.
+SIMILITUD_MINIMA = 0.5
+_NO_ALNUM_ASCII = re.compile(r"[^0-9a-z]+")
+
+def normalizar(texto):
+    """Minúsculas, sin tildes y solo letras/números separados por espacios."""
+    if texto is None or (not isinstance(texto, str) and pd.isna(texto)):
+        return ""
+    texto = str(texto).lower()
+    if texto.isascii():
+        return _NO_ALNUM_ASCII.sub(" ", texto).strip()
+    plegado = unicodedata.normalize("NFKD", texto)
+    plegado = "".join(c for c in plegado if not unicodedata.combining(c))
+    return " ".join("".join(c if c.isalnum() else " " for c in plegado).split())
+
+def _tramos(inicios, largos):
+    """Concatenación de los rangos [inicio, inicio + largo)."""
+    desplazamiento = np.arange(largos.sum()) - np.repeat(np.cumsum(largos) - largos, largos)
+    return np.repeat(inicios, largos) + desplazamiento
+
+def trigramas(textos):
+    """(código int64 de cada trigrama, posición del texto de donde sale). Los
+    tres caracteres (UTF-32, < 2**21) van empaquetados en un entero. Cada
+    palabra se rellena como si empezara el texto: "perz" comparte "  p" con
+    el apellido de "ana perez", no solo con nombres que empiezan por "p"."""
+    rellenos = [f"  {'  '.join(texto.split())} " for texto in textos]
+    puntos = np.frombuffer("".join(rellenos).encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    largos = np.fromiter(map(len, rellenos), dtype=np.int64, count=len(rellenos))
+    ventanas = _tramos(np.cumsum(largos) - largos, largos - 2)
+    codigos = (puntos[ventanas] << 42) | (puntos[ventanas + 1] << 21) | puntos[ventanas + 2]
+    return codigos, np.repeat(np.arange(len(rellenos)), largos - 2)
+
+def _postings(claves, valores, n_claves):
+    """(clave, valor) -> (offsets, valores ordenados): los valores de la clave k
+    están en valores[offsets[k]:offsets[k + 1]], sin repetidos."""
+    n_valores = int(valores.max()) + 1 if len(valores) else 1
+    pares = np.sort(claves.astype(np.int64) * n_valores + valores)
+    pares = pares[np.r_[True, pares[1:] != pares[:-1]]] if len(pares) else pares
+    return np.searchsorted(pares // n_valores, np.arange(n_claves + 1)), pares % n_valores
+
+
+class IndiceEmpleados:
+    def __init__(self, empleados_df):
+        self.empleados = empleados_df
+        vacio = empleados_df.empty
+        n = len(empleados_df)
+
+        # Nombres distintos: cada fila apunta al suyo con self._nombre_de_fila
+        self._nombre_de_fila, crudos = pd.factorize(empleados_df["nombre"], use_na_sentinel=False) if not vacio else (np.array([], dtype=np.int64), [])
+        nombres = [normalizar(nombre) for nombre in crudos]
+        emails = [normalizar(e.split("@")[0]) if isinstance(e, str) else "" for e in empleados_df["email"].tolist()] if not vacio else []
+
+        self._areas, self._codigos_area = pd.factorize(empleados_df["area"]) if not vacio else (np.array([], dtype=np.int64), [])
+        self._codigo_de_area = {area: codigo for codigo, area in enumerate(self._codigos_area)}
+        # Desempate: orden alfabético del nombre plegado (estable por posición)
+        rango_nombre = np.argsort(np.argsort(np.array(nombres, dtype=object), kind="stable"))
+        self._por_nombre = np.argsort(rango_nombre[self._nombre_de_fila], kind="stable") if n else np.array([], dtype=np.int64)
+
+        # Tokens: los del nombre se expanden a todas las filas con ese nombre
+        ids_token = {}
+        tok_nombre, nombre_tok = self._tokens(nombres, ids_token)
+        tok_email, fila_email = self._tokens(emails, ids_token)
+        offsets_nombre, filas_nombre = _postings(np.array(self._nombre_de_fila, dtype=np.int64), np.arange(n), len(nombres))
+        repeticiones = np.diff(offsets_nombre)[nombre_tok]
+        tokens = np.concatenate([np.repeat(tok_nombre, repeticiones), tok_email])
+        filas = np.concatenate([filas_nombre[_tramos(offsets_nombre[nombre_tok], repeticiones)], fila_email])
+
+        # Vocabulario ordenado: el id de token pasa a ser su posición alfabética
+        self._vocabulario = sorted(ids_token)
+        posicion = np.empty(len(ids_token), dtype=np.int64)
+        posicion[[ids_token[t] for t in self._vocabulario]] = np.arange(len(ids_token))
+        self._offsets, self._filas = _postings(posicion[tokens], filas, len(ids_token))
+
+        # Trigramas de los nombres distintos, con el mismo esquema CSR
+        codigos, nombre_tri = trigramas(nombres)
+        self._trigramas, tri = np.unique(codigos, return_inverse=True)
+        self._n_nombres = len(nombres)
+        self._offsets_tri, self._nombres_tri = _postings(tri, nombre_tri, len(self._trigramas))
+
+    @staticmethod
+    def _tokens(textos, ids):
+        """(id de cada token distinto, posición del texto de donde sale); `ids`
+        asigna un entero a cada token nuevo."""
+        piezas = [set(texto.split()) for texto in textos]
+        codigos = [ids.setdefault(p, len(ids)) for grupo in piezas for p in grupo]
+        origen = np.repeat(np.arange(len(piezas)), [len(grupo) for grupo in piezas])
+        return np.array(codigos, dtype=np.int64), origen
+
+    def _rangos(self, token):
+        """(filas con un token que empieza por `token`, filas con ese token exacto)."""
+        inicio = bisect_left(self._vocabulario, token)
+        exacto = bisect_right(self._vocabulario, token, inicio)
+        fin = bisect_left(self._vocabulario, token + "\uffff", exacto)
+        o = self._offsets
+        return self._filas[o[inicio]:o[fin]], self._filas[o[inicio]:o[exacto]]
+
+    def buscar_filas(self, consulta, area=None, limite=None):
+        """Posiciones de fila ordenadas por relevancia: token exacto vale 2, prefijo 1."""
+        tokens = list(dict.fromkeys(normalizar(consulta).split()))
+        if not tokens:
+            return []
+        if area is not None and area not in self._codigo_de_area:
+            return []
+
+        # Máscaras densas: un O(filas) vectorizado por token, sin ordenar postings
+        n = len(self._por_nombre)
+        coincide = np.ones(n, dtype=bool)
+        puntos = np.zeros(n, dtype=np.int16)
+        for token in tokens:
+            prefijo, exacto = self._rangos(token)
+            marca = np.zeros(n, dtype=bool)
+            marca[prefijo] = True
+            coincide &= marca
+            puntos[exacto] += 1
+        if area is not None:
+            coincide &= self._areas == self._codigo_de_area[area]
+        if coincide.any():
+            relevancia = puntos + len(tokens)
+        else:
+            coincide, relevancia = self._parecidos(normalizar(consulta), area)
+
+        candidatas = self._por_nombre[coincide[self._por_nombre]]
+        orden = np.argsort(-relevancia[candidatas], kind="stable")
+        return candidatas[orden[:limite] if limite else orden].tolist()
+
+    def _parecidos(self, consulta, area):
+        """(máscara de filas, similitud por fila) de los nombres con trigramas en común."""
+        de_consulta = np.unique(trigramas([consulta])[0])
+        if not len(self._trigramas):
+            return np.zeros(0, dtype=bool), np.zeros(0)
+        posiciones = np.minimum(np.searchsorted(self._trigramas, de_consulta), len(self._trigramas) - 1)
+        posiciones = posiciones[self._trigramas[posiciones] == de_consulta]
+        o = self._offsets_tri
+        comunes = np.bincount(self._nombres_tri[_tramos(o[posiciones], o[posiciones + 1] - o[posiciones])], minlength=self._n_nombres)
+        similitud = (comunes / len(de_consulta))[self._nombre_de_fila]
+        validas = similitud >= SIMILITUD_MINIMA
+        if area is not None:
+            validas &= self._areas == self._codigo_de_area[area]
+        return validas, similitud
+
+    def buscar(self, consulta, area=None, limite=None):
+        """Empleados que casan con `consulta` (y `area`), los más relevantes primero."""
+        return self.empleados.iloc[self.buscar_filas(consulta, area, limite)]
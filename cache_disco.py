@@ -0,0 +1,168 @@
+import hashlib
+import importlib.util
+import json
+import os
+import threading
+from datetime import datetime
+import pandas as pd
+from db import COLUMNAS_TABLA, ESQUEMA, aplicar_esquema, concat_tabla
+from progreso import progreso_por_okr
+from variables import tablaOkrs, tablaTareas
+
+# --- CACHÉ EN DISCO (ARRANQUE EN CALIENTE) ---
+# Tras un reinicio o un deploy el snapshot se rehace desde Parquet en vez de
+# descargar todo de Supabase. Las tablas se parten por año:
+#   <DIR_CACHE>/<tabla>/anio=2024.parquet  años cerrados: casi no cambian, solo se reescriben
+#                                          si cambia su firma (nº de filas + último updated_at)
+#   <DIR_CACHE>/<tabla>/actual.parquet     año en curso (y filas sin año): se reescribe siempre
+#   <DIR_CACHE>/progreso/anio=2024.parquet progreso por OKR de los años cerrados, con la misma firma
+# Al arrancar, lo guardado se pone al día con db.sincronizar_tabla desde la
+# marca guardada, de todos los años: en un año cerrado aún se cambian estados.
+# manifiesto.json lleva un sello del esquema: si cambian VERSION_CACHE, las
+# columnas o los tipos, todo lo guardado se ignora. Es opcional: sin
+# OKR_CACHE_DIR o sin pyarrow no hace nada.
+DIR_CACHE = os.getenv("OKR_CACHE_DIR")
+VERSION_CACHE = 2
+ACTUAL = "actual"
+
+_lock = threading.Lock()
+
+def disponible():
+    return bool(DIR_CACHE) and importlib.util.find_spec("pyarrow") is not None
+
+def anio_actual():
+    return datetime.now().year
+
+def sello():
+    esquema = json.dumps({"version": VERSION_CACHE, "columnas": COLUMNAS_TABLA, "tipos": ESQUEMA},
+                         sort_keys=True, default=str)
+    return hashlib.sha1(esquema.encode()).hexdigest()[:12]
+
+def _ruta(*partes):
+    return os.path.join(DIR_CACHE, *partes)
+
+def _manifiesto():
+    try:
+        with open(_ruta("manifiesto.json")) as f:
+            manifiesto = json.load(f)
+    except (OSError, ValueError):
+        return {"sello": sello(), "tablas": {}, "progreso": {}}
+    if manifiesto.get("sello") != sello():
+        return {"sello": sello(), "tablas": {}, "progreso": {}}
+    return manifiesto
+
+def _escribir_atomico(ruta, escribir):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f"{ruta}.tmp"
+    escribir(temporal)
+    os.replace(temporal, ruta)
+
+def _guardar_manifiesto(manifiesto):
+    def escribir(ruta):
+        with open(ruta, "w") as f:
+            json.dump(manifiesto, f, indent=2)
+    _escribir_atomico(_ruta("manifiesto.json"), escribir)
+
+def _guardar_parquet(df, *partes):
+    _escribir_atomico(_ruta(*partes), lambda ruta: df.to_parquet(ruta, index=False))
+
+def _borrar(*partes):
+    try:
+        os.remove(_ruta(*partes))
+    except OSError:
+        pass
+
+def _firma(*dfs):
+    """Nº de filas y último updated_at: cambia con cualquier alta, baja o edición."""
+    marcas = [df["updated_at"].max() for df in dfs if not df.empty and "updated_at" in df.columns]
+    marcas = [m for m in marcas if not pd.isna(m)]
+    return [sum(len(df) for df in dfs), max(marcas).isoformat() if marcas else None]
+
+# --- TABLAS ---
+def _anio_de_filas(tabla, df, okrs_df):
+    # Año de cada fila: el suyo en okrs, el de su OKR en tareas; el resto no tiene
+    if tabla == tablaOkrs:
+        return df["anio"].astype("Int64")
+    if tabla == tablaTareas and okrs_df is not None and not okrs_df.empty:
+        return df["link_okr"].map(okrs_df.set_index("id")["anio"].astype("Int64")).astype("Int64")
+    return pd.Series(pd.NA, index=df.index, dtype="Int64")
+
+def leer_tabla(tabla):
+    """(df, marca) guardados de la tabla, o None si no hay caché válida."""
+    if not disponible():
+        return None
+    info = _manifiesto()["tablas"].get(tabla)
+    if not info:
+        return None
+    try:
+        partes = [pd.read_parquet(_ruta(tabla, f"{p}.parquet")) for p in info["particiones"]]
+    except OSError:
+        return None
+    # Si una fila quedó en un año cerrado y en "actual", vale la de "actual" (va última)
+    df = aplicar_esquema(tabla, concat_tabla(tabla, partes)).drop_duplicates("id", keep="last")
+    df = df.sort_values("id", ignore_index=True)
+    return df, (pd.Timestamp(info["marca"]) if info.get("marca") else None)
+
+def guardar_tablas(tablas, marcas, okrs_df=None):
+    """Reescribe la partición del año en curso y las de años cerrados cuya firma
+    cambió (o que faltan); quita las que se quedaron sin filas."""
+    if not disponible():
+        return
+    with _lock:
+        manifiesto = _manifiesto()
+        for tabla, df in tablas.items():
+            info = manifiesto["tablas"].get(tabla, {})
+            firmas_previas, firmas = info.get("firmas", {}), {}
+            anios = _anio_de_filas(tabla, df, okrs_df)
+            cerrado = anios.lt(anio_actual()).fillna(False)
+            for anio, filas in df[cerrado].groupby(anios[cerrado]):
+                particion = f"anio={int(anio)}"
+                firmas[particion] = _firma(filas)
+                if firmas_previas.get(particion) != firmas[particion]:
+                    _guardar_parquet(filas, tabla, f"{particion}.parquet")
+            for particion in set(firmas_previas) - set(firmas):
+                _borrar(tabla, f"{particion}.parquet")
+            _guardar_parquet(df[~cerrado], tabla, f"{ACTUAL}.parquet")
+            marca = marcas.get(tabla)
+            manifiesto["tablas"][tabla] = {
+                "particiones": sorted(firmas) + [ACTUAL],
+                "firmas": firmas,
+                "marca": marca.isoformat() if marca is not None else None,
+            }
+        _guardar_manifiesto(manifiesto)
+
+# --- PROGRESO DE AÑOS CERRADOS ---
+def leer_progreso():
+    """progreso_por_okr de los años cerrados guardados (o None)."""
+    if not disponible():
+        return None
+    anios = [int(a) for a in _manifiesto()["progreso"] if int(a) < anio_actual()]
+    if not anios:
+        return None
+    try:
+        return pd.concat([pd.read_parquet(_ruta("progreso", f"anio={a}.parquet")) for a in anios], ignore_index=True)
+    except OSError:
+        return None
+
+def guardar_progreso(okrs_df, tareas_df):
+    """Guarda el progreso de cada año cerrado; solo recalcula los años cuya firma
+    (sus OKRs y las tareas de esos OKRs) cambió desde la última vez."""
+    if not disponible() or okrs_df.empty:
+        return
+    with _lock:
+        manifiesto = _manifiesto()
+        previas, firmas = manifiesto["progreso"], {}
+        anios = okrs_df["anio"].astype("Int64")
+        for anio in sorted({int(a) for a in anios.dropna().unique() if a < anio_actual()}):
+            okrs_anio = okrs_df[(anios == anio).fillna(False)]
+            tareas_anio = tareas_df[tareas_df["link_okr"].isin(okrs_anio["id"])]
+            firmas[str(anio)] = _firma(okrs_anio, tareas_anio)
+            if previas.get(str(anio)) != firmas[str(anio)]:
+                por_okr = progreso_por_okr(okrs_anio, tareas_anio)
+                por_okr["anio"] = por_okr["anio"].astype("Int64")
+                _guardar_parquet(por_okr, "progreso", f"anio={anio}.parquet")
+        for anio in set(previas) - set(firmas):
+            _borrar("progreso", f"anio={anio}.parquet")
+        if firmas != previas:
+            manifiesto["progreso"] = firmas
+            _guardar_manifiesto(manifiesto)
@@ -1,33 +1,35 @@
 import streamlit as st
-from db import  preguntar_gemini_personalizado,load_okrs, update_okr, update_tarea, delete_okr, delete_tarea,load_tareas, save_area,load_empleados, save_employee, save_okr, save_tarea,load_areas
+from db import  preguntar_gemini_stream, update_okr, update_tarea, delete_okr, delete_tarea, save_area, save_employee, save_okr, save_tarea
+from variables import tablaOkrs, tablaTareas, tablaEmpleados, tablaAreas
 from datetime import datetime
 import pandas as pd
-import time
+from progreso import progreso_por_okr
+from contexto_ia import construir_contexto
+from auth import hash_password
+import snapshot
+import metricas
+from metricas import medido
+from importacion import ORDEN_IMPORTACION, Importacion, leer_archivo, plantilla_csv
 
 anio_actual = datetime.now().year
 
 def calcular_progreso_empleado(okrs_emp, tareas_df):
-    progresos = []
     if okrs_emp.empty:
         return 0.0
-    for _, okr in okrs_emp.iterrows():
-        t_okr = tareas_df[tareas_df['link_okr'] == str(okr['id'])] if not tareas_df.empty else pd.DataFrame()
-        if not t_okr.empty:
-            puntos = t_okr['estado'].map({"Hecho": 1.0, "Haciendo": 0.5, "Pendiente": 0.0}).sum()
-            progresos.append(puntos / len(t_okr))
-        else:
-            progresos.append(0.0)
-    return sum(progresos) / len(progresos) if progresos else 0.0
+    return float(progreso_por_okr(okrs_emp, tareas_df)["progreso"].mean())
 
 @st.fragment
-def render_asistente_ia(okrs_df, user_data):
+@medido
+def render_asistente_ia(user_data):
     st.subheader("🤖 Consultor Estratégico AI (v1 SDK)")
     
-    if okrs_df.empty:
+    store = snapshot.actual((tablaOkrs, tablaTareas)).store
+    if store.okrs_de_empleado(user_data['id']).empty:
         st.info("No hay datos de OKRs registrados para analizar.")
         return
 
-    mis_datos_okr = okrs_df[okrs_df['id_empleado'].astype(str) == str(user_data['id'])].to_dict('records')
+    # Texto compacto del año en curso con el avance de cada OKR
+    mis_datos_okr = construir_contexto(store, user_data['id'])
 
     if "messages" not in st.session_state:
         st.session_state.messages = [
@@ -47,21 +49,64 @@ def render_asistente_ia(okrs_df, user_data):
                 st.markdown(prompt)
 
             with st.chat_message("assistant"):
-                with st.spinner("Consultando con Gemini..."):
-                    try:
-                        respuesta = preguntar_gemini_personalizado(
-                            prompt, 
-                            mis_datos_okr, 
-                            user_data['rol']
-                        )
-                        st.markdown(respuesta)
-                        st.session_state.messages.append({"role": "assistant", "content": respuesta})
-                    except Exception as e:
-                        st.error(f"Error con el nuevo SDK: {e}")
+                try:
+                    # Se pinta token a token según llega de Gemini
+                    respuesta = st.write_stream(preguntar_gemini_stream(
+                        prompt, 
+                        mis_datos_okr, 
+                        user_data['rol']
+                    ))
+                    st.session_state.messages.append({"role": "assistant", "content": respuesta})
+                except Exception as e:
+                    st.error(f"Error con el nuevo SDK: {e}")
         st.rerun(scope="fragment")
 
+FILAS_POR_PAGINA = 50
+ORDEN_EQUIPO = {"Nombre": "nombre", "Cumplimiento": "cumplimiento", "OKRs": "n_okrs", "Área": "area"}
+
+def _render_equipo_tabla(solo_empleados, equipo):
+    """Todo el equipo en un único st.dataframe. Orden y paginación se hacen
+    aquí, así al navegador solo llega la página visible."""
+    por_empleado = equipo.reindex(solo_empleados['id'].to_numpy())
+    tabla = solo_empleados[['id', 'nombre', 'rol', 'area']].reset_index(drop=True)
+    tabla['n_okrs'] = por_empleado['n_okrs'].fillna(0).astype(int).to_numpy()
+    tabla['cumplimiento'] = (por_empleado['progreso'].astype(float).fillna(0.0) * 100).round().astype(int).to_numpy()
+
+    c_orden, c_dir, c_pag = st.columns([2, 1, 1])
+    orden = c_orden.selectbox("Ordenar por", list(ORDEN_EQUIPO.keys()), key="orden_equipo")
+    ascendente = c_dir.toggle("Ascendente", value=True, key="dir_equipo")
+    paginas = max(1, -(-len(tabla) // FILAS_POR_PAGINA))
+    pagina = c_pag.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1, key="pag_equipo")
+
+    inicio = (pagina - 1) * FILAS_POR_PAGINA
+    visible = tabla.sort_values(ORDEN_EQUIPO[orden], ascending=ascendente, kind="stable").iloc[inicio:inicio + FILAS_POR_PAGINA]
+
+    # La clave cambia al abrir un detalle: al volver, la selección empieza vacía
+    generacion = st.session_state.get("gen_tabla_equipo", 0)
+    evento = st.dataframe(
+        visible[['nombre', 'rol', 'area', 'n_okrs', 'cumplimiento']],
+        use_container_width=True,
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"tabla_equipo_{generacion}",
+        column_config={
+            "nombre": st.column_config.TextColumn("NOMBRE"),
+            "rol": st.column_config.TextColumn("ROL"),
+            "area": st.column_config.TextColumn("ÁREA"),
+            "n_okrs": st.column_config.NumberColumn("OKRs"),
+            "cumplimiento": st.column_config.ProgressColumn("Cumplimiento", min_value=0, max_value=100, format="%d%%"),
+        },
+    )
+    st.caption(f"{len(tabla)} empleados · selecciona una fila para ver el detalle")
+    if evento.selection.rows:
+        st.session_state.vista_detalle = visible.iloc[evento.selection.rows[0]]['id']
+        st.session_state.gen_tabla_equipo = generacion + 1
+        st.rerun()
+
 @st.fragment
-def render_manager_dashboard(empleados_df, okrs_df, tareas_df, areas_df):
+@medido
+def render_manager_dashboard():
     if "vista_detalle" not in st.session_state:
         st.session_state.vista_detalle = None
 
@@ -69,78 +114,79 @@ def render_manager_dashboard(empleados_df, okrs_df, tareas_df, areas_df):
         if st.button("⬅️ Volver al Equipo"):
             st.session_state.vista_detalle = None
             st.rerun()
-    
-    if empleados_df.empty:
-        st.info("No hay empleados registrados aún.")
-        return
-    else:
-        empleados_df['id'] = empleados_df['id'].astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
-        
-    if not okrs_df.empty:
-        okrs_df['id'] = okrs_df['id'].astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
-        okrs_df['id_empleado'] = okrs_df['id_empleado'].astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
-
-    if not tareas_df.empty:
-        tareas_df['link_okr'] = tareas_df['link_okr'].astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
-    
-    for df, col in [(okrs_df, 'id_empleado'), (tareas_df, 'link_okr'), (empleados_df, 'id')]:
-        if not df.empty:
-            df[col] = df[col].astype(str).str.replace(".0", "", regex=False).str.strip()
 
     if not st.session_state.vista_detalle:
         st.subheader(f"📊 Progreso del Equipo - {anio_actual}")
         
+        snap = snapshot.actual()
+        areas_df = snap.tablas[tablaAreas]
         areas_disponibles = ["Todas"] + (areas_df['nombre'].tolist() if not areas_df.empty else [])
-        col1, col2,_ = st.columns([1, 2,2])
+        col1, col2, col3 = st.columns([1, 2,2])
         with col1:
             area_sel = st.selectbox("Filtrar por Área/Departamento", areas_disponibles)
         with col2:
-            busqueda_nombre = st.text_input("Buscar empleado por nombre", placeholder="Ej: Juan Pérez")
-        
-        solo_empleados = empleados_df.copy()
-        if area_sel != "Todas":
-            solo_empleados = solo_empleados[solo_empleados['area'] == area_sel]
+            busqueda_nombre = st.text_input("Buscar empleado por nombre o email", placeholder="Ej: juan perez o jperez")
+        with col3:
+            modo = st.radio("Vista", ["Tabla", "Tarjetas"], horizontal=True, key="modo_equipo")
+
+        # Índice compartido del snapshot: se reconstruye solo cuando cambia la versión
+        store = snap.store
+        if store.empleados.empty:
+            st.info("No hay empleados registrados aún.")
+            return
+
         if busqueda_nombre:
-                solo_empleados = solo_empleados[
-                    solo_empleados['nombre'].str.contains(busqueda_nombre, case=False, na=False)
-                ]
+            # Índice del snapshot: sin tildes ni mayúsculas, por prefijo y ordenado por relevancia
+            solo_empleados = store.busqueda.buscar(busqueda_nombre, area=None if area_sel == "Todas" else area_sel)
+        else:
+            solo_empleados = store.empleados if area_sel == "Todas" else store.empleados_de_area(area_sel)
         if solo_empleados.empty:
-            st.warning(f"No hay empleados registrados en el área: {area_sel}")
+            if busqueda_nombre:
+                st.warning(f"Ningún empleado coincide con: {busqueda_nombre}")
+            else:
+                st.warning(f"No hay empleados registrados en el área: {area_sel}")
             return
 
-        for _, emp in solo_empleados.iterrows():
-            okrs_emp = okrs_df[
-                (okrs_df['id_empleado'] == emp['id']) & 
-                (okrs_df['anio'].astype(str) == str(anio_actual))
-            ] if not okrs_df.empty else pd.DataFrame()
+        # Progreso de todo el equipo en una sola pasada
+        equipo = store.progreso_equipo(anio_actual)
+
+        if modo == "Tabla":
+            _render_equipo_tabla(solo_empleados, equipo)
+        else:
+            for _, emp in solo_empleados.iterrows():
+                n_okrs = int(equipo.at[emp['id'], 'n_okrs']) if emp['id'] in equipo.index else 0
             
-            with st.container(border=True):
-                c_info, c_prog, c_btn = st.columns([2, 3, 1])
+                with st.container(border=True):
+                    c_info, c_prog, c_btn = st.columns([2, 3, 1])
                 
-                with c_info:
-                    st.markdown(f"**{emp['nombre']}**")
-                    st.caption(f"{emp['rol']}")
-                    area_display = emp['area'] if pd.notna(emp['area']) and emp['area'] != "" else "Sin Área"
-                    st.caption(f"📍 {area_display} | {len(okrs_emp)} OKRs")
+                    with c_info:
+                        st.markdown(f"**{emp['nombre']}**")
+                        st.caption(f"{emp['rol']}")
+                        area_display = emp['area'] if pd.notna(emp['area']) and emp['area'] != "" else "Sin Área"
+                        st.caption(f"📍 {area_display} | {n_okrs} OKRs")
                 
-                with c_prog:
-                    if not okrs_emp.empty:
-                        promedio = calcular_progreso_empleado(okrs_emp, tareas_df)
-                        st.progress(float(promedio))
-                        st.caption(f"Cumplimiento: {int(promedio*100)}%")
-                    else:
-                        st.caption("Sin objetivos")
-
-                with c_btn:
-                    if st.button("Ver detalle", key=f"btn_{emp['id']}", use_container_width=True):
-                        st.session_state.vista_detalle = emp['id']
-                        st.rerun()
+                    with c_prog:
+                        if n_okrs:
+                            promedio = equipo.at[emp['id'], 'progreso']
+                            st.progress(float(promedio))
+                            st.caption(f"Cumplimiento: {int(promedio*100)}%")
+                        else:
+                            st.caption("Sin objetivos")
+
+                    with c_btn:
+                        if st.button("Ver detalle", key=f"btn_{emp['id']}", use_container_width=True):
+                            st.session_state.vista_detalle = emp['id']
+                            st.rerun()
 
     else:
         emp_id = st.session_state.vista_detalle
-        empleado = empleados_df[empleados_df['id'] == emp_id].iloc[0]
+        store = snapshot.actual().store
+        empleado = store.empleado(emp_id)
+        if empleado is None:
+            st.info("El empleado ya no existe.")
+            return
 
-        okrs_del_empleado = okrs_df[okrs_df['id_empleado'] == emp_id] if not okrs_df.empty else pd.DataFrame()
+        okrs_del_empleado = store.okrs_de_empleado(emp_id)
         
         if okrs_del_empleado.empty:
             st.info(f"{empleado['nombre']} aún no tiene OKRs registrados.")
@@ -154,7 +200,7 @@ def render_manager_dashboard(empleados_df, okrs_df, tareas_df, areas_df):
         with col2:
             anio_sel = st.selectbox("📅 Filtrar por Año", años_disponibles)
         
-        okrs_emp = okrs_del_empleado[okrs_del_empleado['anio'] == anio_sel]
+        okrs_emp = store.okrs_de_empleado(emp_id, anio_sel)
 
         if okrs_emp.empty:
             st.warning(f"No hay OKRs para el año {anio_sel}.")
@@ -173,16 +219,14 @@ def render_manager_dashboard(empleados_df, okrs_df, tareas_df, areas_df):
                             lista_est_okr = ["Nuevo", "Incompleto", "Completo"]
                             idx_okr = lista_est_okr.index(okr['estado']) if okr['estado'] in lista_est_okr else 0
                             nuevo_estado_okr = st.selectbox("Estado OKR", lista_est_okr, index=idx_okr, key=f"mngr_upd_okr_{okr['id']}", label_visibility="collapsed")
-                            id_actual = str(okr['id']).strip().replace(".0", "")
                             if nuevo_estado_okr != okr['estado']:
                                 with st.spinner("Actualizando..."):
-                                    if update_okr(id_actual, {"estado": nuevo_estado_okr}):
-                                        st.cache_data.clear()
+                                    if snapshot.escribir(tablaOkrs, lambda: update_okr(okr['id'], {"estado": nuevo_estado_okr})):
                                         st.toast("✅ OKR actualizado")
                                         st.rerun()
 
                         st.markdown("<hr style='margin: 0.5em 0px; border-top: 1px solid #ccc; opacity: 0.3;'>", unsafe_allow_html=True)
-                        mis_tareas = tareas_df[tareas_df["link_okr"] == str(okr['id'])] if not tareas_df.empty else pd.DataFrame()
+                        mis_tareas = store.tareas_de_okr(okr['id'])
                         if not mis_tareas.empty:
                             for _, t in mis_tareas.iterrows():
                                 t_col1, t_col2 = st.columns([4, 2])
@@ -191,31 +235,24 @@ def render_manager_dashboard(empleados_df, okrs_df, tareas_df, areas_df):
                                 idx_t = lista_estados_t.index(t['estado']) if t['estado'] in lista_estados_t else 0
                                 nuevo_e_t = t_col2.selectbox("Estado Tarea", lista_estados_t, index=idx_t, key=f"mngr_upd_t_{t['id']}", label_visibility="collapsed")
                                 if nuevo_e_t != t['estado']:
-                                    if update_tarea(t['id'], {"estado": nuevo_e_t}):
-                                        st.cache_data.clear()
+                                    if snapshot.escribir(tablaTareas, lambda: update_tarea(t['id'], {"estado": nuevo_e_t})):
                                         st.toast("✅ Tarea actualizada")
                                         st.rerun(scope="fragment")
                         else:
                             st.caption("No hay tareas registradas.")
 
 @st.fragment
-def render_mis_okrs_empleado(okrs_df, tareas_df, user_id_actual):
+@medido
+def render_mis_okrs_empleado(user_id_actual):
     st.subheader(f"🎯 Mis Objetivos Personales - {anio_actual}")
     
-    # 1. Initialize Session State for OKRs and Tasks
-    if "okrs_runtime" not in st.session_state:
-        st.session_state.okrs_runtime = okrs_df
-    if "tareas_runtime" not in st.session_state:
-        st.session_state.tareas_runtime = tareas_df
-
-    # 2. Use the runtime state as the source of truth
-    working_okrs = st.session_state.okrs_runtime
-    working_tareas = st.session_state.tareas_runtime
+    # El snapshot compartido es la fuente de verdad
+    store = snapshot.actual((tablaOkrs, tablaTareas)).store
     
-    # Filter corporate OKRs for the dropdown
-    okrs_org = working_okrs[working_okrs["tipo"] == "Organizacion"] if not working_okrs.empty else pd.DataFrame()
+    # OKRs corporativos para el desplegable
+    okrs_org = store.corporativos(anio_actual)
     
-    # --- FORM: NEW PERSONAL OKR ---
+    # --- FORMULARIO: NUEVO OKR PERSONAL ---
     with st.expander("Nuevo Objetivo Personal"):
         if okrs_org.empty:
             st.warning("No hay OKRs corporativos definidos para vincular.")
@@ -234,25 +271,16 @@ def render_mis_okrs_empleado(okrs_df, tareas_df, user_id_actual):
                             "id_empleado": user_id_actual, "link_org": okr_corp_opciones[okr_corp_seleccionado],
                             "anio": anio_actual, "estado": estado
                         }
-                        if save_okr(nuevo_okr):
-                            # Update state from DB
-                            st.session_state.okrs_runtime = load_okrs()
+                        if snapshot.escribir(tablaOkrs, lambda: save_okr(nuevo_okr)):
                             st.toast(f"✅ OKR '{nombre}' creado.")
-                            time.sleep(1)
                             st.rerun(scope="fragment")
 
     st.divider()
 
-    # --- LIST: PERSONAL OKRS ---
-    # Filter my personal OKRs from the runtime state
-    if not working_okrs.empty:
-        mis_okrs = working_okrs[
-            (working_okrs["tipo"] == "Empleado") & 
-            (working_okrs["id_empleado"].astype(str) == str(user_id_actual)) & 
-            (working_okrs["anio"].astype(str) == str(anio_actual))
-        ]
-    else:
-        mis_okrs = pd.DataFrame()
+    # --- LISTADO: OKRS PERSONALES ---
+    mis_okrs = store.okrs_de_empleado(user_id_actual, anio_actual)
+    if not mis_okrs.empty:
+        mis_okrs = mis_okrs[mis_okrs["tipo"] == "Empleado"]
 
     if mis_okrs.empty:
         st.info("Aún no tienes objetivos personales registrados.")
@@ -268,17 +296,15 @@ def render_mis_okrs_empleado(okrs_df, tareas_df, user_id_actual):
                     st.markdown(f"**Estado:** :{color}[{row['estado']}]")
                 with col_del:
                     if st.button("🗑️", key=f"del_okr_{row['id']}"):
-                        if delete_okr(row['id']):
-                            st.session_state.okrs_runtime = load_okrs()
+                        if snapshot.escribir(tablaOkrs, lambda: delete_okr(row['id']), accion="delete"):
                             st.toast("✅ OKR eliminado.")
-                            time.sleep(1)
                             st.rerun(scope="fragment")
 
-                # --- TASKS SECTION ---
+                # --- TAREAS ---
                 with st.expander(f"📝 Tareas de este objetivo"):
-                    # Filter tasks from the runtime state
+                    # Tareas de este OKR desde el índice del store
                     current_okr_id = str(row["id"])
-                    mis_tareas = working_tareas[working_tareas["link_okr"] == current_okr_id] if not working_tareas.empty else pd.DataFrame()
+                    mis_tareas = store.tareas_de_okr(row["id"])
                     
                     with st.form(key=f"form_tarea_{row['id']}", clear_on_submit=True):
                         tc1, tc2, tc3 = st.columns([3, 2, 1])
@@ -286,10 +312,9 @@ def render_mis_okrs_empleado(okrs_df, tareas_df, user_id_actual):
                         t_estado = tc2.selectbox("Estado", ["Pendiente", "Haciendo", "Hecho"], key=f"st_{row['id']}")
                         if tc3.form_submit_button("➕"):
                             if t_nombre:
-                                if save_tarea({"nombre": t_nombre, "estado": t_estado, "link_okr": current_okr_id, "id_empleado": user_id_actual}):
-                                    st.session_state.tareas_runtime = load_tareas()
+                                nueva_tarea = {"nombre": t_nombre, "estado": t_estado, "link_okr": current_okr_id, "id_empleado": user_id_actual}
+                                if snapshot.escribir(tablaTareas, lambda: save_tarea(nueva_tarea)):
                                     st.toast("✅ Tarea agregada.")
-                                    time.sleep(0.5)
                                     st.rerun(scope="fragment")
 
                     if not mis_tareas.empty:
@@ -297,54 +322,39 @@ def render_mis_okrs_empleado(okrs_df, tareas_df, user_id_actual):
                             t_col1, t_col2, t_col3 = st.columns([4, 2, 1])
                             t_col1.write(f"• {t['nombre']}")
                             
-                            # Status update logic
+                            # Cambio de estado
                             nuevo_e = t_col2.selectbox("E", ["Pendiente", "Haciendo", "Hecho"], 
                                                       index=["Pendiente", "Haciendo", "Hecho"].index(t['estado']),
                                                       key=f"upd_t_{t['id']}", label_visibility="collapsed")
                             if nuevo_e != t['estado']:
-                                if update_tarea(t['id'], {"estado": nuevo_e}):
-                                    st.session_state.tareas_runtime = load_tareas()
+                                if snapshot.escribir(tablaTareas, lambda: update_tarea(t['id'], {"estado": nuevo_e})):
                                     st.toast("✅ Estado actualizado.")
-                                    time.sleep(0.5)
                                     st.rerun(scope="fragment")
                             
-                            # Delete task logic
+                            # Borrado de la tarea
                             if t_col3.button("❌", key=f"del_t_{t['id']}"):
-                                if delete_tarea(t['id']):
-                                    st.session_state.tareas_runtime = load_tareas()
+                                if snapshot.escribir(tablaTareas, lambda: delete_tarea(t['id']), accion="delete"):
                                     st.toast("🗑️ Tarea eliminada.")
-                                    time.sleep(0.5)
                                     st.rerun(scope="fragment")
 
 
 @st.fragment
-def render_okrs_corporativos(okrs_df):
+@medido
+def render_okrs_corporativos():
     c1, c2 = st.columns([3, 1])
     c1.subheader("Gestión de OKRs Corporativos")
     
-    if "okrs_runtime" not in st.session_state:
-        st.session_state.okrs_runtime = okrs_df
-
-    okrs_working_df = st.session_state.okrs_runtime
-
-    if okrs_working_df is None or (isinstance(okrs_working_df, pd.DataFrame) and okrs_working_df.empty):
-        okrs_org = pd.DataFrame(columns=["id", "nombre", "descripcion", "tipo", "anio", "estado"])
-    else:
-        # Filter safely: check if 'tipo' exists before filtering
-        if "tipo" in okrs_working_df.columns:
-            okrs_org = okrs_working_df[okrs_working_df["tipo"] == "Organizacion"]
-        else:
-            okrs_org = pd.DataFrame()
+    store = snapshot.actual((tablaOkrs, tablaTareas, tablaEmpleados)).store
+    okrs_org = store.corporativos()
     with st.expander("➕ Definir Nuevo OKR Corporativo"):
         with st.form("nuevo_okr_org", clear_on_submit=True):
             nombre = st.text_input("Nombre del Objetivo")
             descripcion = st.text_area("Descripción")
             if st.form_submit_button("Crear OKR Corporativo", use_container_width=True):
-                exito = save_okr({"nombre": nombre, "descripcion": descripcion, "tipo": "Organizacion", "id_empleado": None, "anio": anio_actual, "estado": "Nuevo"})
+                nuevo_okr = {"nombre": nombre, "descripcion": descripcion, "tipo": "Organizacion", "id_empleado": None, "anio": anio_actual, "estado": "Nuevo"}
+                exito = snapshot.escribir(tablaOkrs, lambda: save_okr(nuevo_okr))
                 if exito:    
-                    st.session_state.okrs_runtime = load_okrs()
                     st.toast(f"✅ ¡{nombre} registrado con éxito!")
-                    time.sleep(1.5)
                     st.rerun(scope="fragment")
                 else:
                     st.error("Por favor, contacta a soporte: antopiscio@gmail.com")
@@ -360,30 +370,37 @@ def render_okrs_corporativos(okrs_df):
                 with col_txt:
                     st.markdown(f"### {row['nombre']}")
                     st.write(row['descripcion'])
+                    rollup = store.rollup_corporativo(row['id'])
+                    _render_rollup(rollup)
+                    if rollup["okrs"]:
+                        with st.expander("Por área"):
+                            st.dataframe(
+                                store.rollup_por_area(row['id']),
+                                use_container_width=True,
+                                hide_index=True,
+                                column_config={
+                                    "area": st.column_config.TextColumn("ÁREA"),
+                                    "contribuyentes": st.column_config.NumberColumn("Contribuyentes"),
+                                    "okrs": st.column_config.NumberColumn("OKRs"),
+                                    "tareas": st.column_config.NumberColumn("Tareas"),
+                                    "progreso": st.column_config.ProgressColumn("Avance", min_value=0, max_value=1, format="percent"),
+                                },
+                            )
                 with col_actions:
                     if st.button("🗑️ Borrar", key=f"del_corp_{row['id']}"):
-                        exito = delete_okr(row['id'])
+                        exito = snapshot.escribir(tablaOkrs, lambda: delete_okr(row['id']), accion="delete")
                         if exito:
-                            if "okrs_runtime" in st.session_state:
-                                st.session_state.okrs_runtime = load_okrs()
-
                             st.toast("✅ OKR Borrado exitosamente")
-                            time.sleep(1)
                             st.rerun(scope="fragment")
 
 @st.fragment
-def render_gestion_empleados_fragment(empleados_df, areas_df):
+@medido
+def render_gestion_empleados_fragment():
     st.subheader("Personal de la Empresa")
 
-    if "empleados_runtime" not in st.session_state:
-        st.session_state.empleados_runtime = empleados_df
-    
-    if "areas_runtime" not in st.session_state:
-        st.session_state.areas_runtime = areas_df
-
-    # 2. Reference the working data from State
-    working_empl = st.session_state.empleados_runtime
-    working_areas = st.session_state.areas_runtime
+    # Reference the working data from the shared snapshot (with this session's pending deltas)
+    working_empl = snapshot.vista(tablaEmpleados)
+    working_areas = snapshot.vista(tablaAreas)
 
     # Display Employee Table
     if not working_empl.empty:
@@ -415,7 +432,7 @@ def render_gestion_empleados_fragment(empleados_df, areas_df):
                 u_email = st.text_input("Email Corporativo")
             with col2:
                 u_rol = st.selectbox("Rol en el sistema", ["empleado", "manager"])
-                # Use areas from the runtime state
+                # Use areas from the snapshot
                 lista_areas = working_areas['nombre'].tolist() if not working_areas.empty else ["Sin áreas definidas"]
                 u_area = st.selectbox("Area/Depto", lista_areas)
                 u_pass = st.text_input("Contraseña Temporal", type="password")
@@ -423,19 +440,17 @@ def render_gestion_empleados_fragment(empleados_df, areas_df):
             if st.form_submit_button("Guardar Empleado", use_container_width=True):
                 if u_nom and u_email and u_pass:
                     with st.spinner("Guardando..."):
-                        exito = save_employee({
+                        nuevo_empleado = {
                             "nombre": u_nom, 
                             "email": u_email, 
-                            "password": u_pass, 
+                            "password": hash_password(u_pass), 
                             "rol": u_rol, 
                             "area": u_area
-                        })
+                        }
+                        # La fila devuelta se recorta a las columnas del snapshot (sin password)
+                        exito = snapshot.escribir(tablaEmpleados, lambda: save_employee(nuevo_empleado))
                         if exito:
-                            # OPTIMIZATION: Update state immediately
-                            # Assuming you have a load_employees() helper, otherwise use your main load method
-                            st.session_state.empleados_runtime = load_empleados() 
                             st.toast(f"✅ ¡{u_nom} registrado con éxito!")
-                            time.sleep(1)
                             st.rerun(scope="fragment")
                         else:
                             st.error("Error al guardar. Contacta a soporte.")
@@ -446,40 +461,28 @@ def render_gestion_empleados_fragment(empleados_df, areas_df):
             area_nom = st.text_input("Nombre del Área")
             if st.form_submit_button("Guardar Área"):
                 if area_nom:
-                    if save_area({"nombre": area_nom}):
-                        # OPTIMIZATION: Update areas state immediately
-                        st.session_state.areas_runtime = load_areas() 
+                    if snapshot.escribir(tablaAreas, lambda: save_area({"nombre": area_nom})):
                         st.toast(f"✅ Área '{area_nom}' registrada.")
-                        time.sleep(1)
                         st.rerun(scope="fragment")
 @st.fragment
-def render_employee_dashboard(okrs_df, tareas_df, user_id_actual):
+@medido
+def render_employee_dashboard(user_id_actual):
     st.subheader("📊 Mi Progreso Histórico")
 
-    # 1. Inicializar Session State para que el dashboard sea "vivo"
-    if "okrs_runtime" not in st.session_state:
-        st.session_state.okrs_runtime = okrs_df
-    if "tareas_runtime" not in st.session_state:
-        st.session_state.tareas_runtime = tareas_df
     if st.button("🔄 Actualizar Datos"):
-                # Update the session state from DB
-                st.session_state.okrs_runtime = load_okrs()
-                st.session_state.tareas_runtime = load_tareas()
+                # Sincronización incremental del snapshot: solo viaja lo que cambió
+                snapshot.refrescar()
                 st.toast("✅ Datos sincronizados")
-                time.sleep(1)
                 st.rerun(scope="fragment")
-    # 3. Usar el runtime state
-    working_okrs = st.session_state.okrs_runtime
-    working_tareas = st.session_state.tareas_runtime
+    # 3. Usar el snapshot compartido
+    store = snapshot.actual((tablaOkrs, tablaTareas)).store
 
-    if working_okrs.empty:
+    if store.okrs.empty:
         st.info("No hay datos de OKRs disponibles.")
         return
 
     # 4. Filtrado del empleado actual
-    id_buscado = str(user_id_actual)
-    # Limpieza de IDs para evitar errores de comparación
-    datos_empleado = working_okrs[working_okrs['id_empleado'].astype(str).str.replace(".0","",regex=False) == id_buscado]
+    datos_empleado = store.okrs_de_empleado(user_id_actual)
 
     if datos_empleado.empty:
         st.info("Aún no tienes objetivos registrados para mostrar en el gráfico de progreso.")
@@ -492,23 +495,14 @@ def render_employee_dashboard(okrs_df, tareas_df, user_id_actual):
         anio_sel = st.selectbox("Selecciona el año", options=mis_anios)
     
 
-    okrs_filtrados = datos_empleado[datos_empleado['anio'].astype(str) == str(anio_sel)]
+    okrs_filtrados = store.okrs_de_empleado(user_id_actual, anio_sel)
 
-    # 6. Renderizado de barras de progreso
+    # 6. Renderizado de barras de progreso (mismo motor que el dashboard del manager)
     for _, okr in okrs_filtrados.iterrows():
-        # Filtramos tareas del OKR específico desde el runtime
-        tareas_okr = working_tareas[working_tareas['link_okr'] == str(okr['id'])] if not working_tareas.empty else pd.DataFrame()
-        
+        porcentaje = store.progreso_okr(okr['id'])
         with st.container(border=True):
             c1, c2 = st.columns([3, 1])
             
-            if not tareas_okr.empty:
-                # Cálculo de puntos basado en estado
-                puntos = tareas_okr['estado'].map({"Hecho": 1.0, "Haciendo": 0.5, "Pendiente": 0.0}).sum()
-                porcentaje = (puntos / len(tareas_okr))
-            else: 
-                porcentaje = 0.0
-            
             c1.markdown(f"**{okr['nombre']}**")
             # Limitamos el progreso entre 0.0 y 1.0 para evitar errores de st.progress
             progreso_final = max(0.0, min(float(porcentaje), 1.0))
@@ -516,28 +510,132 @@ def render_employee_dashboard(okrs_df, tareas_df, user_id_actual):
             
             c2.metric("Avance", f"{int(progreso_final * 100)}%")
 
-def render_manager_view(empleados_df, okrs_df, tareas_df, areas_df):
-    st.title("🛡️ Panel de Dirección")
-    tabs = st.tabs(["📊 Dashboard Equipo", "🎯 OKRs Corporativos", "👥 Empleados"])
-    with tabs[0]: render_manager_dashboard(empleados_df, okrs_df, tareas_df, areas_df)
-    with tabs[1]: render_okrs_corporativos(okrs_df)
-    with tabs[2]: render_gestion_empleados_fragment(empleados_df, areas_df)
-    #with tabs[3]: render_asistente_ia(okrs_df,  st.session_state.user)
+# --- ROUTER DE SECCIONES ---
+# st.tabs ejecuta el cuerpo de todas las pestañas en cada rerun. El router solo
+# carga (en el snapshot) las tablas que declara la sección activa y solo la renderiza.
+def render_secciones(secciones, key):
+    """secciones: lista de (etiqueta, tablas que necesita, función de render)."""
+    etiquetas = [etiqueta for etiqueta, _, _ in secciones]
+    activa = st.radio("Sección", etiquetas, horizontal=True, key=key, label_visibility="collapsed")
+    _, tablas, render = secciones[etiquetas.index(activa)]
+    try:
+        snapshot.actual(tablas)
+    except Exception:
+        st.error("Error al conectar con la base de datos.")
+        st.stop()
+    render()
+
+def render_okrs_empresa():
+    st.subheader("🏢 Objetivos Globales")
+
+    store = snapshot.actual((tablaOkrs, tablaTareas)).store
+    okrs_corp = store.corporativos(anio_actual)
+    if okrs_corp.empty:
+        st.info("No hay objetivos corporativos.")
+    else:
+        for _, r in okrs_corp.iterrows():
+            with st.container(border=True):
+                st.write(f"**{r['nombre']}**")
+                st.caption(r['descripcion'])
+                _render_rollup(store.rollup_corporativo(r['id']))
+
+def _render_rollup(rollup):
+    """Barra de avance de un OKR corporativo a partir de sus OKRs personales vinculados."""
+    if not rollup["okrs"]:
+        st.caption("Aún no hay OKRs personales vinculados.")
+        return
+    st.progress(float(rollup["progreso"]))
+    st.caption(f"Avance {int(rollup['progreso'] * 100)}% · {rollup['contribuyentes']} contribuyentes · "
+               f"{rollup['okrs']} OKRs vinculados · {rollup['tareas']} tareas")
+
+@st.fragment
+def render_panel_metricas():
+    st.subheader("🛠️ Rendimiento")
+    c_act, c_reset = st.columns([3, 1])
+    activo = c_act.toggle("Registrar métricas (Supabase y fragmentos)", value=metricas.activo())
+    if activo != metricas.activo():
+        metricas.activar(activo)
+    if c_reset.button("Reiniciar", use_container_width=True):
+        metricas.reiniciar()
+    if snapshot.tiempos_carga:
+        st.caption("Última carga por tabla: " + " · ".join(
+            f"{tabla} {segundos:.2f} s" for tabla, segundos in snapshot.tiempos_carga.items()))
+
+    filas = metricas.tabla_agregados()
+    if not filas:
+        st.info("Sin métricas todavía. Actívalas y navega por la app.")
+        return
+    st.dataframe(
+        pd.DataFrame(filas)[["tipo", "nombre", "operacion", "llamadas", "media_ms", "max", "filas", "bytes"]],
+        use_container_width=True,
+        hide_index=True,
+        column_config={"max": st.column_config.NumberColumn("max (s)", format="%.3f")},
+    )
+    with st.expander("Últimas llamadas"):
+        st.dataframe(pd.DataFrame(metricas.ultimos_eventos()[::-1]), use_container_width=True, hide_index=True)
+    with st.expander("Formato Prometheus"):
+        texto = metricas.texto_prometheus()
+        st.code(texto, language="text")
+        st.download_button("Descargar", texto, file_name="metricas.prom", mime="text/plain")
+
+@st.fragment
+@medido
+def render_importacion():
+    st.subheader("📥 Importación masiva")
+    st.caption("CSV o XLSX. Un XLSX con hojas areas, empleados, okrs y tareas se importa entero, en ese orden. "
+               "Las áreas se indican por nombre, los empleados por email y link_org / link_okr por id o nombre del OKR.")
+    c_tabla, c_plantilla = st.columns([3, 1])
+    tabla = c_tabla.selectbox("Tabla (CSV o XLSX de una sola hoja)", ORDEN_IMPORTACION)
+    c_plantilla.download_button("Plantilla CSV", plantilla_csv(tabla), file_name=f"plantilla_{tabla}.csv",
+                                mime="text/csv", use_container_width=True)
+    archivo = st.file_uploader("Fichero", type=["csv", "xlsx"])
+    if archivo is None or not st.button("Importar", type="primary"):
+        return
+
+    barra = st.progress(0.0, text="Leyendo fichero...")
+    def al_avanzar(t, procesadas, total):
+        barra.progress(min(procesadas / total, 1.0), text=f"{t}: {procesadas} filas procesadas")
+    try:
+        importacion = Importacion(snapshot.actual(ORDEN_IMPORTACION).tablas, al_avanzar)
+        resultados = {t: importacion.importar(t, filas, total) for t, filas, total in leer_archivo(archivo, archivo.name, tabla)}
+    except ImportError:
+        st.error("Para importar .xlsx hace falta openpyxl (pip install openpyxl).")
+        return
+    except Exception as e:
+        st.error(f"No se pudo leer el fichero: {e}")
+        return
+    finally:
+        barra.empty()
+    # Lo insertado llega al snapshot por la sincronización incremental, sin recargar tablas
+    snapshot.refrescar()
+
+    for t, r in resultados.items():
+        st.write(f"**{t}**: {r['ok']} filas importadas, {len(r['errores'])} con errores")
+    errores = pd.DataFrame([{"tabla": t, "fila": fila, "error": mensaje}
+                            for t, r in resultados.items() for fila, mensaje in r["errores"]])
+    if errores.empty:
+        st.success("✅ Importación completa.")
+    else:
+        st.dataframe(errores, use_container_width=True, hide_index=True)
+        st.download_button("Descargar errores", errores.to_csv(index=False), file_name="errores_importacion.csv",
+                           mime="text/csv")
 
-def render_employee_view(user_data, okrs_df, tareas_df):
+def render_manager_view():
+    st.title("🛡️ Panel de Dirección")
+    render_secciones([
+        ("📊 Dashboard Equipo", snapshot.TODAS, render_manager_dashboard),
+        ("🎯 OKRs Corporativos", (tablaOkrs, tablaTareas, tablaEmpleados), render_okrs_corporativos),
+        ("👥 Empleados", (tablaEmpleados, tablaAreas), render_gestion_empleados_fragment),
+        ("📥 Importar", snapshot.TODAS, render_importacion),
+        ("🛠️ Rendimiento", (), render_panel_metricas),
+        #("🤖 Asistente IA", (tablaOkrs, tablaTareas), lambda: render_asistente_ia(st.session_state.user)),
+    ], key="seccion_manager_runtime")
+
+def render_employee_view(user_data):
     st.title(f"🚀 Panel de: {user_data['nombre']}")
-    tabs = st.tabs(["📊 Dashboard", "📉 Mis Objetivos", "🏢 OKRs Empresa"])
-    with tabs[0]: render_employee_dashboard(okrs_df, tareas_df, user_data['id'])
-    with tabs[1]: render_mis_okrs_empleado(okrs_df, tareas_df, user_data['id'])
-    with tabs[2]:
-        st.subheader("🏢 Objetivos Globales")
-
-        okrs_corp = okrs_df[okrs_df["tipo"] == "Organizacion"] if not okrs_df.empty else pd.DataFrame()
-        if okrs_corp.empty:
-            st.info("No hay objetivos corporativos.")
-        else:
-            for _, r in okrs_corp.iterrows():
-                with st.container(border=True):
-                    st.write(f"**{r['nombre']}**")
-                    st.caption(r['descripcion'])
-    #with tabs[3]: render_asistente_ia(okrs_df, user_data)
\ No newline at end of file
+    render_secciones([
+        ("📊 Dashboard", (tablaOkrs, tablaTareas), lambda: render_employee_dashboard(user_data['id'])),
+        ("📉 Mis Objetivos", (tablaOkrs, tablaTareas), lambda: render_mis_okrs_empleado(user_data['id'])),
+        ("🏢 OKRs Empresa", (tablaOkrs, tablaTareas), render_okrs_empresa),
+        #("🤖 Asistente IA", (tablaOkrs, tablaTareas), lambda: render_asistente_ia(user_data)),
+    ], key="seccion_empleado_runtime")
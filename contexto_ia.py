@@ -0,0 +1,75 @@
+import pandas as pd
+from datetime import datetime
+
+# --- CONTEXTO COMPACTO PARA EL ASISTENTE ---
+# En lugar de volcar to_dict('records') de todos los OKRs (todos los años y
+# columnas), se arma un texto corto con el año relevante, el avance de cada
+# OKR y sus tareas, recortado a un presupuesto de tokens.
+TOKENS_CONTEXTO = 1500
+CHARS_POR_TOKEN = 4  # aproximación suficiente para presupuestar
+MAX_DESCRIPCION = 120
+
+def estimar_tokens(texto):
+    return -(-len(texto) // CHARS_POR_TOKEN)
+
+def _recortar(texto, limite):
+    texto = " ".join(str(texto).split())
+    return texto if len(texto) <= limite else texto[:limite - 1] + "…"
+
+def _anio_relevante(okrs, anio):
+    # El año pedido si tiene OKRs; si no, el más reciente que tenga. "anio" es
+    # categórica sin orden (db.ESQUEMA): max() solo funciona como número
+    anios = okrs["anio"].astype("Int64").dropna()
+    if anio in set(anios.tolist()):
+        return anio
+    return int(anios.max()) if not anios.empty else anio
+
+def _bloque_okr(store, okr, con_tareas):
+    progreso = store.progreso_okr(okr["id"])
+    linea = f"- {okr['nombre']} [{okr['estado']}, {int(progreso * 100)}%]"
+    if pd.notna(okr.get("link_org")):
+        corporativo = store.okr(okr["link_org"])
+        if corporativo is not None:
+            linea += f" → empresa: {corporativo['nombre']}"
+    lineas = [linea]
+    if pd.notna(okr.get("descripcion")) and okr.get("descripcion"):
+        lineas.append(f"  {_recortar(okr['descripcion'], MAX_DESCRIPCION)}")
+
+    tareas = store.tareas_de_okr(okr["id"])
+    if con_tareas:
+        lineas += [f"  · {t['nombre']} [{t['estado']}]" for _, t in tareas.iterrows()]
+    elif not tareas.empty:
+        conteo = tareas["estado"].value_counts()
+        lineas.append("  tareas: " + ", ".join(f"{n} {estado}" for estado, n in conteo.items() if n))
+    return "\n".join(lineas)
+
+def construir_contexto(store, id_empleado, anio=None, max_tokens=TOKENS_CONTEXTO):
+    """Contexto de OKRs del empleado para el prompt, dentro de `max_tokens`.
+    Se degrada por pasos: sin listado de tareas, menos OKRs y, en último
+    caso, solo un resumen con totales."""
+    okrs = store.okrs_de_empleado(id_empleado)
+    if okrs.empty:
+        return "El usuario aún no tiene OKRs registrados."
+
+    anio = _anio_relevante(okrs, anio or datetime.now().year)
+    okrs_anio = store.okrs_de_empleado(id_empleado, anio)
+    progresos = [store.progreso_okr(i) for i in okrs_anio["id"]]
+    resumen = (f"Año {anio}: {len(okrs_anio)} OKRs personales, "
+               f"avance medio {int(100 * sum(progresos) / len(progresos)) if progresos else 0}%.")
+
+    for con_tareas in (True, False):
+        bloques = [_bloque_okr(store, okr, con_tareas) for _, okr in okrs_anio.iterrows()]
+        texto = "\n".join([resumen] + bloques)
+        if estimar_tokens(texto) <= max_tokens:
+            return texto
+
+    # Entran tantos OKRs (sin tareas) como permita el presupuesto
+    incluidos = [resumen]
+    for i, bloque in enumerate(bloques):
+        resto = f"… y {len(bloques) - i} OKRs más."
+        if estimar_tokens("\n".join(incluidos + [bloque, resto])) > max_tokens:
+            incluidos.append(resto)
+            break
+        incluidos.append(bloque)
+    texto = "\n".join(incluidos)
+    return texto if estimar_tokens(texto) <= max_tokens else _recortar(resumen, max_tokens * CHARS_POR_TOKEN)
@@ -2,9 +2,13 @@ import streamlit as st
 import pandas as pd
 from dotenv import load_dotenv
 import os
-from supabase import create_client, Client
-from google import genai
-from google.genai import types
+import threading
+import hashlib
+import json
+from collections import OrderedDict
+import time
+from datetime import datetime
+from backends import SupabaseBackend, SqliteBackend, ReplicaBackend
 from variables import *
 load_dotenv()
 # --- CONFIGURACIÓN SEGÚN TU ESTRUCTURA ---
@@ -12,55 +16,358 @@ url = os.getenv("SUPABASE_URL")
 key = os.getenv("SUPABASE_KEY")
 env = os.getenv("SUPABASE_ENV")
 gemini = os.getenv("GEMINI_API_KEY")
-supabase: Client = create_client(url, key)
+
+# --- CLIENTES (PEREZOSOS) ---
+# supabase y google.genai se importan y se construyen en el primer uso: la
+# página de login no paga su importación ni la creación de los clientes.
+@st.cache_resource
+def get_supabase():
+    from supabase import create_client
+    return create_client(url, key)
+
+# --- BACKEND DE DATOS (backends.py) ---
+# OKR_BACKEND: "supabase" (por defecto), "sqlite" (todo local en OKR_SQLITE,
+# para pruebas y demos sin conexión) o "replica" (lecturas de la réplica local
+# OKR_SQLITE, escrituras a Supabase).
+@st.cache_resource
+def get_backend():
+    tipo = os.getenv("OKR_BACKEND", "supabase")
+    if tipo == "sqlite":
+        return SqliteBackend(os.getenv("OKR_SQLITE", "okrs.sqlite3"))
+    principal = SupabaseBackend(get_supabase())
+    if tipo == "replica":
+        backend = ReplicaBackend(principal, SqliteBackend(os.getenv("OKR_SQLITE", "replica.sqlite3")))
+        backend.sincronizar()
+        return backend
+    return principal
+
+def sincronizar_replica():
+    """Con OKR_BACKEND=replica trae a la réplica lo cambiado en Supabase."""
+    backend = get_backend()
+    if isinstance(backend, ReplicaBackend):
+        backend.sincronizar()
+
+# --- CACHÉ POR TABLA ---
+# Cada tabla tiene un contador de versión compartido por todo el proceso.
+# La versión forma parte de la clave de st.cache_data, así que una escritura
+# en "tareas" solo invalida "tareas" y el resto sigue saliendo de caché.
+CACHE_TTL = 300
+
+@st.cache_resource
+def _versiones_tablas():
+    return {"lock": threading.Lock(), "versiones": {}}
+
+def version_tabla(tabla):
+    return _versiones_tablas()["versiones"].get(tabla, 0)
+
+def invalidar_tabla(tabla):
+    """Sube la versión de la tabla para que la próxima lectura vaya a Supabase."""
+    estado = _versiones_tablas()
+    with estado["lock"]:
+        estado["versiones"][tabla] = estado["versiones"].get(tabla, 0) + 1
+
+# --- LECTURA PAGINADA ---
+# PostgREST corta cada respuesta en su max-rows (1000 por defecto), así que
+# PAGE_SIZE no debe superarlo: una página incompleta marca el final.
+PAGE_SIZE = 1000
+
+COLUMNAS_TABLA = {
+    tablaEmpleados: columnasEmpleados,
+    tablaOkrs: columnasOkrs,
+    tablaTareas: columnasTareas,
+    tablaAreas: columnasAreas,
+}
+
+# --- ESQUEMA DE TIPOS ---
+# Se aplica una sola vez al leer: IDs como enteros con nulos (Int64) y las
+# columnas de pocos valores como categorías. Las vistas ya no normalizan IDs.
+ESQUEMA = {
+    tablaEmpleados: {"id": "Int64", "rol": "category", "area": "category", "updated_at": "datetime"},
+    tablaOkrs: {"id": "Int64", "id_empleado": "Int64", "link_org": "Int64",
+                "anio": ("Int64", "category"), "tipo": "category", "estado": "category",
+                "updated_at": "datetime"},
+    tablaTareas: {"id": "Int64", "id_empleado": "Int64", "link_okr": "Int64", "estado": "category",
+                  "updated_at": "datetime"},
+    tablaAreas: {"id": "Int64", "updated_at": "datetime"},
+}
+
+def aplicar_esquema(tabla, df):
+    for columna, tipos in ESQUEMA.get(tabla, {}).items():
+        if columna not in df.columns:
+            continue
+        for tipo in (tipos if isinstance(tipos, tuple) else (tipos,)):
+            if tipo == "Int64":
+                # link_okr llega como texto; "12", 12 y 12.0 quedan en 12
+                df[columna] = pd.to_numeric(df[columna], errors="coerce").astype("Int64")
+            elif tipo == "datetime":
+                # ISO8601: sin él pandas deduce el formato de la primera fila y las que
+                # traen otra precisión de fracciones de segundo quedan en NaT
+                df[columna] = pd.to_datetime(df[columna], utc=True, errors="coerce", format="ISO8601")
+            else:
+                df[columna] = df[columna].astype(tipo)
+    return df
+
+def concat_tabla(tabla, partes):
+    # concat pierde las categorías cuando difieren entre partes
+    return aplicar_esquema(tabla, pd.concat(partes, ignore_index=True))
+
+def alinear_tipos(tabla, df, nuevas):
+    """(df, nuevas) con `nuevas` (pocas filas) en las columnas y tipos de df, para
+    concatenarlas sin volver a tipar df entero. Las categorías que no estaban se
+    añaden a df (solo cambia el diccionario de categorías, no los códigos)."""
+    nuevas = aplicar_esquema(tabla, nuevas.reindex(columns=df.columns))
+    for columna in df.columns:
+        tipo = df[columna].dtype
+        if isinstance(tipo, pd.CategoricalDtype):
+            faltan = [v for v in nuevas[columna].dropna().unique() if v not in tipo.categories]
+            if faltan:
+                df = df.assign(**{columna: df[columna].cat.add_categories(faltan)})
+                tipo = df[columna].dtype
+        nuevas[columna] = nuevas[columna].astype(tipo)
+    return df, nuevas
+
+def _lista_columnas(columnas):
+    return [] if columnas == "*" else [c.strip() for c in columnas.split(",")]
+
+def leer_paginado(tabla, columnas="*", page_size=PAGE_SIZE, orden="id", filtros=()):
+    """Recorre la tabla en ventanas range() y arma el DataFrame por partes.
+    filtros: tuplas (metodo, columna, valor), p.ej. ("eq", "anio", 2025) o ("in_", "id", (1, 2))."""
+    partes = []
+    inicio = 0
+    while True:
+        filas = get_backend().leer(tabla, columnas, filtros, orden, inicio, page_size)
+        if filas:
+            partes.append(pd.DataFrame(filas))
+        if len(filas) < page_size:
+            break
+        inicio += page_size
+    if not partes:
+        return pd.DataFrame(columns=_lista_columnas(columnas))
+    return pd.concat(partes, ignore_index=True)
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=256, show_spinner=False)
+def _fetch_tabla(tabla, version, columnas):
+    return aplicar_esquema(tabla, leer_paginado(tabla, columnas))
+
+def load_tabla(tabla, columnas=None):
+    """Devuelve la tabla entera desde caché mientras no cambie su versión ni
+    expire el TTL. Las tablas se cargan enteras (snapshot.py): ya no hay
+    consultas filtradas por rol."""
+    columnas = columnas or COLUMNAS_TABLA.get(tabla, "*")
+    return _fetch_tabla(tabla, version_tabla(tabla), columnas)
+
+# --- DELTAS LOCALES ---
+def aplicar_delta(df, tabla, accion, fila, pk_col="id"):
+    """Devuelve una copia de df con `fila` insertada/actualizada ("upsert") o
+    quitada ("delete"), conservando el orden y el esquema de tipos. `fila`
+    puede traer solo las columnas que cambian."""
+    pk = fila.get(pk_col)
+    mascara = (df[pk_col] == pk).fillna(False).to_numpy() if pk_col in df.columns and pk is not None else None
+    if accion == "delete":
+        return df if mascara is None else df[~mascara].reset_index(drop=True)
+
+    existe = mascara is not None and mascara.any()
+    nueva = df[mascara].iloc[0].to_dict() if existe else {}
+    nueva.update(fila)
+    if not len(df.columns):
+        return aplicar_esquema(tabla, pd.DataFrame([nueva]))
+    # Solo se tipa la fila nueva: re-tipar la tabla entera costaba ~0,3 s por
+    # edición con 120k tareas, y publicar() lo hace con el lock del snapshot
+    df, nueva_df = alinear_tipos(tabla, df, pd.DataFrame([nueva]))
+    if not existe:
+        return pd.concat([df, nueva_df], ignore_index=True)
+    pos = int(mascara.argmax())
+    return pd.concat([df.iloc[:pos], nueva_df, df.iloc[pos + 1:]], ignore_index=True)
+
+# --- MUTACIONES POR LOTES ---
+# Un lote por petición en lugar de una petición por fila. Si un lote falla
+# se reintenta fila a fila (todas las operaciones son idempotentes o atómicas
+# por lote), así el resultado dice exactamente qué filas fallaron.
+BULK_CHUNK = 500
+# Máximo de ids por filtro in_ (borrados y ediciones por lotes), para no
+# pasarse del largo de URL que acepta PostgREST.
+IN_CHUNK = 200
+
+def _valor_json(valor):
+    return valor.isoformat() if isinstance(valor, (pd.Timestamp, datetime)) else valor
+
+def _registros(df):
+    # Valores nativos de Python (sin NA/numpy, fechas en ISO) para que el JSON sea válido
+    filas = df.astype(object).where(df.notna(), None).to_dict("records")
+    return [{c: _valor_json(v) for c, v in fila.items()} for fila in filas]
+
+def _por_lotes(items, tam, enviar, identificar):
+    # "filas": lo que devuelve el backend (p.ej. las filas insertadas con su id)
+    resultado = {"ok": 0, "errores": [], "filas": []}
+    for i in range(0, len(items), tam):
+        lote = items[i:i + tam]
+        try:
+            resultado["filas"] += enviar(lote) or []
+            resultado["ok"] += len(lote)
+        except Exception:
+            for item in lote:
+                try:
+                    resultado["filas"] += enviar([item]) or []
+                    resultado["ok"] += 1
+                except Exception as e:
+                    resultado["errores"].append((identificar(item), str(e)))
+    return resultado
+
+def insert_bulk(tabla, filas, chunk=BULK_CHUNK):
+    """Inserta en lotes de `chunk`; devuelve también las filas insertadas (con su id)."""
+    filas = list(filas)
+    resultado = _por_lotes(
+        filas, chunk,
+        lambda lote: get_backend().insertar(tabla, lote),
+        lambda fila: fila,
+    )
+    invalidar_tabla(tabla)
+    return resultado
+
+def delete_bulk(tabla, ids, pk_col="id"):
+    """Borra con delete().in_(pk, ids): una petición cada IN_CHUNK ids."""
+    ids = [i for i in ids if i is not None]
+    resultado = _por_lotes(
+        ids, IN_CHUNK,
+        lambda lote: get_backend().borrar(tabla, (("in_", pk_col, lote),)),
+        lambda i: i,
+    )
+    invalidar_tabla(tabla)
+    return resultado
 
 # --- MÉTODO CORE PARA DATA_EDITOR ---
-def update_database_from_editor(table_name, df_changes, pk_col="id"):
-    """Procesa los cambios del st.data_editor y los sube a Supabase"""
-    # 1. Filas editadas
-    for index, row in df_changes.get("edited_rows", {}).items():
-        # Obtenemos el ID real desde el dataframe original guardado en session_state
-        real_id = st.session_state[f"original_{table_name}"].iloc[index][pk_col]
-        supabase.table(table_name).update(row).eq(pk_col, real_id).execute()
-    
-    # 2. Filas eliminadas
-    for index in df_changes.get("deleted_rows", []):
-        real_id = st.session_state[f"original_{table_name}"].iloc[index][pk_col]
-        supabase.table(table_name).delete().eq(pk_col, real_id).execute()
+def update_database_from_editor(table_name, df_changes, pk_col="id", original=None):
+    """Procesa los cambios del st.data_editor y los sube a Supabase por lotes.
+    `original` es el DataFrame mostrado en el editor (por defecto el de la sesión).
+    Devuelve {"ok": n, "errores": [(id, mensaje), ...]}."""
+    if original is None:
+        original = st.session_state[f"original_{table_name}"]
+    resultado = {"ok": 0, "errores": []}
+
+    # 1. Filas editadas: solo las columnas cambiadas, con update().in_() por
+    # grupo de filas con los mismos cambios. Nunca la fila entera: un upsert
+    # resucitaría filas borradas mientras tanto y pisaría otras columnas.
+    edited = df_changes.get("edited_rows", {})
+    if edited:
+        ids = original[pk_col].iloc[list(edited.keys())].tolist()
+        grupos = {}
+        for id_fila, cambios in zip(ids, edited.values()):
+            cambios = {c: _valor_json(None if pd.isna(v) else v) for c, v in cambios.items()}
+            grupos.setdefault(tuple(sorted(cambios.items())), []).append(int(id_fila))
+        for clave, ids_grupo in grupos.items():
+            cambios = dict(clave)
+            parcial = _por_lotes(
+                ids_grupo, IN_CHUNK,
+                lambda lote: get_backend().actualizar(table_name, cambios, (("in_", pk_col, lote),)),
+                lambda i: i,
+            )
+            resultado["ok"] += parcial["ok"]
+            resultado["errores"] += parcial["errores"]
+        invalidar_tabla(table_name)
+
+    # 2. Filas eliminadas: un solo delete().in_()
+    deleted = df_changes.get("deleted_rows", [])
+    if deleted:
+        ids = _registros(original.iloc[deleted][[pk_col]])
+        parcial = delete_bulk(table_name, [r[pk_col] for r in ids], pk_col)
+        resultado["ok"] += parcial["ok"]
+        resultado["errores"] += parcial["errores"]
 
     # 3. Filas añadidas
     added_rows = df_changes.get("added_rows", [])
     if added_rows:
-        supabase.table(table_name).insert(added_rows).execute()
-    
-    st.cache_data.clear()
+        parcial = insert_bulk(table_name, added_rows)
+        resultado["ok"] += parcial["ok"]
+        resultado["errores"] += parcial["errores"]
+
+    if resultado["errores"]:
+        st.error(f"{len(resultado['errores'])} filas no se pudieron guardar.")
+    return resultado
 
 # --- LECTURA DE DATOS ---
-def load_all_data():
-    emp = pd.DataFrame(supabase.table(tablaEmpleados).select("*").execute().data)
-    okr = pd.DataFrame(supabase.table(tablaOkrs).select("*").execute().data)
-    tar = pd.DataFrame(supabase.table(tablaTareas).select("*").execute().data)
-    are = pd.DataFrame(supabase.table(tablaAreas).select("*").execute().data)
-    return emp, okr, tar, are
-
-def load_okrs():
-    okr = pd.DataFrame(supabase.table(tablaOkrs).select("*").execute().data)
-    return okr
-def load_areas():
-    areas = pd.DataFrame(supabase.table(tablaAreas).select("*").execute().data)
-    return areas
-def load_empleados():
-    emp = pd.DataFrame(supabase.table(tablaEmpleados).select("*").execute().data)
-    return emp
-def load_tareas():
-    tareas = pd.DataFrame(supabase.table(tablaTareas).select("*").execute().data)
-    return tareas
+# Las vistas leen del snapshot compartido (snapshot.py), que carga cada tabla
+# una vez por proceso y luego la sincroniza; aquí solo queda el límite de
+# cargas en paralelo que usa.
+MAX_CARGAS_CONCURRENTES = 4
+
+# --- SINCRONIZACIÓN INCREMENTAL ---
+# Cada tabla tiene updated_at (trigger) y los borrados dejan una lápida en
+# tablaEliminados (ver sql/sincronizacion.sql). Refrescar trae solo lo que
+# cambió desde la marca de agua: el coste depende del movimiento, no del tamaño.
+# La marca la guarda quien llama: las filas que entran por deltas locales traen
+# su propio updated_at y no deben adelantarla.
+MARGEN_SYNC = pd.Timedelta(seconds=5)  # solape para transacciones que confirman tarde
+
+def marca_de_agua(df):
+    if df.empty or "updated_at" not in df.columns:
+        return None
+    marca = df["updated_at"].max()
+    return None if pd.isna(marca) else marca
+
+def leer_cambios(tabla, marca, columnas=None):
+    """(filas cambiadas, ids borrados) desde `marca`, con MARGEN_SYNC de solape."""
+    columnas = columnas or COLUMNAS_TABLA.get(tabla, "*")
+    desde = (marca - MARGEN_SYNC).isoformat()
+    # Orden con desempate por id: un insert por lotes deja cientos de filas con el
+    # mismo updated_at y Postgres no garantiza el mismo orden entre páginas
+    cambios = aplicar_esquema(tabla, leer_paginado(
+        tabla, columnas, orden="updated_at, id", filtros=(("gte", "updated_at", desde),)))
+    cambios = cambios.drop_duplicates("id", keep="last")
+    borrados = leer_paginado(
+        tablaEliminados, "id", orden="deleted_at, id", filtros=(("eq", "tabla", tabla), ("gte", "deleted_at", desde)))
+    ids_borrados = set(borrados["id"].dropna().tolist()) if not borrados.empty else set()
+    return cambios, ids_borrados
+
+def mezclar_cambios(df, tabla, marca, cambios, ids_borrados):
+    """Devuelve (df, nueva_marca) con los cambios de leer_cambios aplicados;
+    el mismo df si no hay nada."""
+    quitar = set(cambios["id"].dropna().tolist()) | ids_borrados
+    if not quitar:
+        return df, marca
+    resto = df[~df["id"].isin(quitar).fillna(False)]
+    resto, cambios = alinear_tipos(tabla, resto, cambios)
+    df = pd.concat([resto, cambios], ignore_index=True).sort_values("id", ignore_index=True)
+    return df, max(marca, marca_de_agua(cambios) or marca)
+
+def sincronizar_tabla(df, tabla, marca, columnas=None):
+    """Mezcla en df las filas cambiadas o borradas desde `marca`.
+    Devuelve (df, nueva_marca). Sin marca hace una carga completa."""
+    columnas = columnas or COLUMNAS_TABLA.get(tabla, "*")
+    if marca is None:
+        df = load_tabla(tabla, columnas)
+        return df, marca_de_agua(df)
+    cambios, ids_borrados = leer_cambios(tabla, marca, columnas)
+    return mezclar_cambios(df, tabla, marca, cambios, ids_borrados)
+
+def load_credencial(email):
+    """Fila de login de un email (índice único) o None. Única lectura que incluye
+    la password; no se cachea y no queda nada de la tabla en memoria."""
+    filas = get_backend().leer(tablaEmpleados, columnasCredenciales, (("eq", "email", str(email).strip()),), limite=1)
+    return filas[0] if filas else None
+
+def update_password(id_empleado, password_hash):
+    try:
+        get_backend().actualizar(tablaEmpleados, {"password": password_hash}, (("eq", "id", id_empleado),))
+        return True
+    except Exception as e:
+        st.error(f"Error Supabase: {e}")
+        return False
+
 # --- GUARDADO INDIVIDUAL (FORMULARIOS) ---
+# Cada escritura devuelve la fila afectada (False si falla o no vuelve ninguna)
+# para que la vista pueda aplicarla como delta sobre sus frames de runtime sin
+# recargar la tabla.
+def _fila_devuelta(filas):
+    # Sin fila devuelta (update/delete de una fila que ya borró otra sesión, o un
+    # insert que no devuelve representación) no hay nada que publicar: inventarla
+    # con el dict de entrada metería en el snapshot una fila fantasma sin id
+    return filas[0] if filas else False
+
 def save_area( new_area_dict):
     try:
-        supabase.table(tablaAreas).insert(new_area_dict).execute()
-        st.cache_data.clear()
-        return True
+        filas = get_backend().insertar(tablaAreas, new_area_dict)
+        invalidar_tabla(tablaAreas)
+        return _fila_devuelta(filas)
     except Exception as e:
         st.error(f"Error Supabase: {e}")
         return False
@@ -68,27 +375,27 @@ def save_area( new_area_dict):
 def save_employee(new_user_dict):
     try:
         # Supabase genera el ID automáticamente si usas UUID o Serial
-        supabase.table("empleados").insert(new_user_dict).execute()
-        st.cache_data.clear()
-        return True
+        filas = get_backend().insertar(tablaEmpleados, new_user_dict)
+        invalidar_tabla(tablaEmpleados)
+        return _fila_devuelta(filas)
     except Exception as e:
         st.error(f"Error Supabase: {e}")
         return False
 
 def save_okr(nuevo_okr_dict):
     try:
-        supabase.table(tablaOkrs).insert(nuevo_okr_dict).execute()
-        st.cache_data.clear()
-        return True
+        filas = get_backend().insertar(tablaOkrs, nuevo_okr_dict)
+        invalidar_tabla(tablaOkrs)
+        return _fila_devuelta(filas)
     except Exception as e:
         st.error(f"Error Supabase: {e}")
         return False
 
 def save_tarea(nueva_tarea_dict):
     try:
-        supabase.table(tablaTareas).insert(nueva_tarea_dict).execute()
-        st.cache_data.clear()
-        return True
+        filas = get_backend().insertar(tablaTareas, nueva_tarea_dict)
+        invalidar_tabla(tablaTareas)
+        return _fila_devuelta(filas)
     except Exception as e:
         st.error(f"Error Supabase: {e}")
         return False
@@ -96,54 +403,133 @@ def save_tarea(nueva_tarea_dict):
 # --- ACTUALIZACIONES Y BORRADOS PUNTUALES ---
 def update_okr(id_okr, nuevos_datos):
     try:
-        supabase.table(tablaOkrs).update(nuevos_datos).eq("id", id_okr).execute()
-        st.cache_data.clear()
-        return True
+        filas = get_backend().actualizar(tablaOkrs, nuevos_datos, (("eq", "id", id_okr),))
+        invalidar_tabla(tablaOkrs)
+        return _fila_devuelta(filas)
     except Exception:
         return False
 
 def delete_okr(id_okr):
     try:
-        supabase.table(tablaOkrs).delete().eq("id", id_okr).execute()
-        st.cache_data.clear()
-        return True
+        filas = get_backend().borrar(tablaOkrs, (("eq", "id", id_okr),))
+        invalidar_tabla(tablaOkrs)
+        return _fila_devuelta(filas)
     except Exception:
         return False
 
 def update_tarea(tarea_id, nuevos_datos):
     try:
-        supabase.table(tablaTareas).update(nuevos_datos).eq("id", tarea_id).execute()
-        st.cache_data.clear()
-        return True
+        filas = get_backend().actualizar(tablaTareas, nuevos_datos, (("eq", "id", tarea_id),))
+        invalidar_tabla(tablaTareas)
+        return _fila_devuelta(filas)
     except Exception:
         return False
 
 def delete_tarea(tarea_id):
     try:
-        supabase.table(tablaTareas).delete().eq("id", tarea_id).execute()
-        st.cache_data.clear()
-        return True
+        filas = get_backend().borrar(tablaTareas, (("eq", "id", tarea_id),))
+        invalidar_tabla(tablaTareas)
+        return _fila_devuelta(filas)
     except Exception:
         return False
 
 # --- FUNCIÓN IA (SE MANTIENE IGUAL PERO USANDO SECRETS) ---
-def preguntar_gemini_personalizado(prompt, contexto_okrs, rol_usuario):
-    try:
-        client = genai.Client(api_key=gemini)
-        instrucciones_sistema = f"""
+MODELO_GEMINI = 'gemini-2.0-flash'
+GEMINI_CACHE_MAX = 256
+GEMINI_CACHE_TTL = 3600
+
+@st.cache_resource
+def get_gemini_client():
+    # Un solo cliente por proceso (conexiones HTTP reutilizadas)
+    from google import genai
+    return genai.Client(api_key=gemini)
+
+class _CacheLRU:
+    """LRU con caducidad: misma pregunta sobre el mismo contexto y rol no se vuelve a pagar."""
+    def __init__(self, max_entradas, ttl):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            valor, guardado = entrada
+            if time.monotonic() - guardado > self.ttl:
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def put(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic())
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+@st.cache_resource
+def _cache_respuestas():
+    return _CacheLRU(GEMINI_CACHE_MAX, GEMINI_CACHE_TTL)
+
+def _clave_respuesta(prompt, contexto_okrs, rol_usuario):
+    contexto = contexto_okrs if isinstance(contexto_okrs, str) else json.dumps(contexto_okrs, sort_keys=True, default=str, ensure_ascii=False)
+    return (prompt.strip(), hashlib.sha256(contexto.encode()).hexdigest(), rol_usuario)
+
+def _config_gemini(contexto_okrs, rol_usuario):
+    from google.genai import types
+    instrucciones_sistema = f"""
         Eres un consultor experto en OKRs. Usuario: {rol_usuario}.
-        Contexto: {contexto_okrs}.
+        Contexto (OKRs del usuario con su avance):
+        {contexto_okrs}
         Ayuda al usuario a mejorar sus objetivos y tareas de forma estratégica.
         Responde en español con tono profesional.
         """
+    return types.GenerateContentConfig(
+        system_instruction=instrucciones_sistema,
+        temperature=0.7
+    )
+
+def preguntar_gemini_personalizado(prompt, contexto_okrs, rol_usuario, client=None):
+    clave = _clave_respuesta(prompt, contexto_okrs, rol_usuario)
+    cacheada = _cache_respuestas().get(clave)
+    if cacheada is not None:
+        return cacheada
+    try:
+        client = client or get_gemini_client()
         response = client.models.generate_content(
-            model='gemini-2.0-flash',
+            model=MODELO_GEMINI,
             contents=prompt,
-            config=types.GenerateContentConfig(
-                system_instruction=instrucciones_sistema,
-                temperature=0.7
-            )
+            config=_config_gemini(contexto_okrs, rol_usuario)
         )
+        _cache_respuestas().put(clave, response.text)
         return response.text
     except Exception as e:
-        return f"Error técnico en la IA: {str(e)}"
\ No newline at end of file
+        return f"Error técnico en la IA: {str(e)}"
+
+def preguntar_gemini_stream(prompt, contexto_okrs, rol_usuario, client=None):
+    """Igual que preguntar_gemini_personalizado pero va devolviendo el texto por
+    trozos (para st.write_stream). La respuesta completa queda en la caché."""
+    clave = _clave_respuesta(prompt, contexto_okrs, rol_usuario)
+    cacheada = _cache_respuestas().get(clave)
+    if cacheada is not None:
+        yield cacheada
+        return
+    partes = []
+    try:
+        client = client or get_gemini_client()
+        for chunk in client.models.generate_content_stream(
+            model=MODELO_GEMINI,
+            contents=prompt,
+            config=_config_gemini(contexto_okrs, rol_usuario)
+        ):
+            if chunk.text:
+                partes.append(chunk.text)
+                yield chunk.text
+    except Exception as e:
+        yield f"Error técnico en la IA: {str(e)}"
+        return
+    _cache_respuestas().put(clave, "".join(partes))
@@ -0,0 +1,323 @@
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pandas as pd
+from auth import ITERACIONES_TEMPORAL, hash_password
+from db import BULK_CHUNK, insert_bulk
+from variables import tablaAreas, tablaEmpleados, tablaOkrs, tablaTareas, puntosEstadoTarea
+
+# --- IMPORTACIÓN MASIVA (CSV / XLSX) ---
+# Alta de una organización entera sin pasar por los formularios fila a fila:
+#   * el fichero se lee por lotes (csv / openpyxl en modo read_only), sin
+#     convertirlo antes en un DataFrame
+#   * cada fila se valida y sus claves foráneas se resuelven en memoria contra el
+#     snapshot y contra lo ya importado: área por nombre, empleado por email,
+#     link_org y link_okr por id o por nombre del OKR
+#   * las filas válidas van a db.insert_bulk (una petición por lote); el
+#     progreso se avisa con al_avanzar tras cada lote leído
+#   * los errores llevan el número de fila del fichero (la cabecera es la 1)
+# En un XLSX cada hoja se llama como su tabla y se importan en ORDEN_IMPORTACION,
+# así las filas pueden apuntar a las de hojas anteriores del mismo libro.
+ORDEN_IMPORTACION = (tablaAreas, tablaEmpleados, tablaOkrs, tablaTareas)
+COLUMNAS_IMPORTACION = {
+    tablaAreas: ["nombre"],
+    tablaEmpleados: ["nombre", "email", "password", "rol", "area"],
+    tablaOkrs: ["nombre", "descripcion", "tipo", "email", "link_org", "anio", "estado"],
+    tablaTareas: ["nombre", "estado", "link_okr", "email"],
+}
+OBLIGATORIAS = {
+    tablaAreas: ["nombre"],
+    tablaEmpleados: ["nombre", "email", "password", "area"],
+    tablaOkrs: ["nombre"],
+    tablaTareas: ["nombre", "link_okr"],
+}
+ROLES = ("empleado", "manager")
+TIPOS_OKR = ("Organizacion", "Empleado")
+ESTADOS_OKR = ("Nuevo", "En curso", "Completo", "Incompleto")
+ESTADOS_TAREA = tuple(puntosEstadoTarea)
+
+def _texto(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)  # openpyxl devuelve 2025.0 para un año
+    return str(valor).strip()
+
+def _clave(texto):
+    return " ".join(str(texto).lower().split())
+
+def _opcion(valor, opciones, por_defecto, campo):
+    """El valor de `opciones` que coincide sin mayúsculas (o `por_defecto` si viene vacío)."""
+    if not valor:
+        return por_defecto
+    for opcion in opciones:
+        if _clave(opcion) == _clave(valor):
+            return opcion
+    raise ValueError(f"{campo} '{valor}' no válido (use: {', '.join(opciones)})")
+
+def _fila(cabecera, valores):
+    # Filas cortas: las columnas que faltan quedan vacías
+    valores = list(valores) + [None] * (len(cabecera) - len(valores))
+    return {c: _texto(v) for c, v in zip(cabecera, valores) if c}
+
+def _lotes(filas, tam):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) == tam:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+# --- LECTURA DEL FICHERO ---
+def filas_csv(archivo):
+    """(nº de fila, dict) de un CSV con cabecera; detecta ',' ';' o tabulador."""
+    archivo.seek(0)
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    try:
+        muestra = texto.read(4096)
+        texto.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.reader(texto, dialecto)
+        cabecera = [_clave(c) for c in next(lector, [])]
+        for valores in lector:
+            if any(v.strip() for v in valores):
+                yield lector.line_num, _fila(cabecera, valores)
+    finally:
+        # Sin detach, al cerrarse el wrapper cerraría también el fichero subido
+        texto.detach()
+
+def _libro(archivo):
+    from openpyxl import load_workbook  # solo hace falta para .xlsx
+    archivo.seek(0)
+    return load_workbook(archivo, read_only=True, data_only=True)
+
+def filas_xlsx(archivo, hoja):
+    libro = _libro(archivo)
+    try:
+        filas = libro[hoja].iter_rows(values_only=True)
+        cabecera = [_clave(_texto(c)) for c in next(filas, ())]
+        for numero, valores in enumerate(filas, start=2):
+            if any(_texto(v) for v in valores):
+                yield numero, _fila(cabecera, valores)
+    finally:
+        libro.close()
+
+def leer_archivo(archivo, nombre_archivo, tabla=None):
+    """[(tabla, filas, total aproximado)] a importar, en ORDEN_IMPORTACION.
+    Un CSV (o un XLSX sin hojas con nombre de tabla) se importa como `tabla`."""
+    if not nombre_archivo.lower().endswith(".xlsx"):
+        total = max(archivo.getvalue().count(b"\n") - 1, 1)
+        return [(tabla, filas_csv(archivo), total)]
+    libro = _libro(archivo)
+    try:
+        hojas = {_clave(h.title): (h.title, h.max_row or 1) for h in libro.worksheets}
+        primera = libro.worksheets[0]
+        por_tabla = [(t, *hojas[t]) for t in ORDEN_IMPORTACION if t in hojas]
+        if not por_tabla:
+            por_tabla = [(tabla, primera.title, primera.max_row or 1)]
+    finally:
+        libro.close()
+    return [(t, filas_xlsx(archivo, hoja), max(n - 1, 1)) for t, hoja, n in por_tabla]
+
+def plantilla_csv(tabla):
+    return ",".join(COLUMNAS_IMPORTACION[tabla]) + "\n"
+
+
+class _Pendiente(ValueError):
+    """Referencia a un OKR que aún no existe pero puede venir más abajo en el fichero."""
+
+
+class Importacion:
+    """Una importación en curso. Los índices para resolver claves foráneas salen
+    del snapshot y crecen con cada lote insertado."""
+
+    def __init__(self, tablas, al_avanzar=None, tam_lote=BULK_CHUNK):
+        self.al_avanzar = al_avanzar
+        self.tam_lote = tam_lote
+        self.anio = datetime.now().year
+        self.areas, self.emails, self.okrs, self.okrs_por_nombre = {}, {}, {}, {}
+        self._hash_de = {}
+        vacia = pd.DataFrame()
+        for fila in self._filas(tablas.get(tablaAreas, vacia)):
+            self._registrar(tablaAreas, fila)
+        for fila in self._filas(tablas.get(tablaEmpleados, vacia)):
+            self._registrar(tablaEmpleados, fila)
+        for fila in self._filas(tablas.get(tablaOkrs, vacia)):
+            self._registrar(tablaOkrs, fila)
+
+    @staticmethod
+    def _filas(df):
+        if df is None or df.empty:
+            return []
+        return df.astype(object).where(df.notna(), None).to_dict("records")
+
+    def _registrar(self, tabla, fila):
+        if tabla == tablaAreas:
+            self.areas[_clave(fila["nombre"])] = fila["nombre"]
+        elif tabla == tablaEmpleados:
+            self.emails[_clave(fila["email"])] = fila.get("id")
+        elif tabla == tablaOkrs:
+            id_okr = int(fila["id"])
+            self.okrs[id_okr] = (fila.get("tipo"), fila.get("id_empleado"), fila.get("anio"))
+            self.okrs_por_nombre.setdefault(_clave(fila["nombre"]), []).append(id_okr)
+
+    # --- VALIDACIÓN POR TABLA ---
+    # Devuelven el registro a insertar o lanzan ValueError con el motivo.
+    def _area(self, f):
+        if _clave(f["nombre"]) in self.areas:
+            raise ValueError(f"El área '{f['nombre']}' ya existe")
+        self.areas[_clave(f["nombre"])] = f["nombre"]
+        return {"nombre": f["nombre"]}
+
+    def _empleado(self, f):
+        email = f["email"]
+        if "@" not in email:
+            raise ValueError(f"Email no válido: '{email}'")
+        if _clave(email) in self.emails:
+            raise ValueError(f"El email '{email}' ya está registrado")
+        if _clave(f["area"]) not in self.areas:
+            raise ValueError(f"Área desconocida: '{f['area']}'")
+        registro = {
+            "nombre": f["nombre"], "email": email, "password": f["password"],
+            "rol": _opcion(f.get("rol"), ROLES, "empleado", "Rol"),
+            "area": self.areas[_clave(f["area"])],
+        }
+        self.emails[_clave(email)] = None  # reservado hasta que el insert devuelva el id
+        return registro
+
+    def _id_empleado(self, email):
+        if _clave(email) not in self.emails or self.emails[_clave(email)] is None:
+            raise ValueError(f"Empleado desconocido: '{email}'")
+        return self.emails[_clave(email)]
+
+    def _buscar_okr(self, ref, campo, tipo=None, id_empleado=None, anio=None):
+        """id de OKR por id o por nombre; con varios del mismo nombre desempata por
+        dueño y año."""
+        if ref.isdigit():
+            if int(ref) not in self.okrs:
+                raise ValueError(f"{campo}: no existe el OKR {ref}")
+            candidatos = [int(ref)]
+        else:
+            candidatos = self.okrs_por_nombre.get(_clave(ref), [])
+        if tipo:
+            candidatos = [c for c in candidatos if self.okrs[c][0] == tipo]
+        if not candidatos:
+            raise _Pendiente(f"{campo}: no hay ningún OKR '{ref}'" + (f" de tipo {tipo}" if tipo else ""))
+        for posicion, filtro in ((1, id_empleado), (2, anio)):
+            if len(candidatos) > 1 and filtro is not None:
+                candidatos = [c for c in candidatos if self.okrs[c][posicion] == filtro] or candidatos
+        if len(candidatos) > 1:
+            raise ValueError(f"{campo}: hay {len(candidatos)} OKRs '{ref}', use el id")
+        return candidatos[0]
+
+    def _okr(self, f):
+        email = f.get("email", "")
+        tipo = _opcion(f.get("tipo"), TIPOS_OKR, "Empleado" if email else "Organizacion", "Tipo")
+        try:
+            anio = int(f.get("anio") or self.anio)
+        except ValueError:
+            raise ValueError(f"Año no válido: '{f['anio']}'")
+        id_empleado = None
+        if tipo == "Empleado":
+            if not email:
+                raise ValueError("Un OKR de tipo Empleado necesita el email de su dueño")
+            id_empleado = self._id_empleado(email)
+        link_org = None
+        if f.get("link_org"):
+            link_org = self._buscar_okr(f["link_org"], "link_org", "Organizacion", anio=anio)
+        return {
+            "nombre": f["nombre"], "descripcion": f.get("descripcion", ""), "tipo": tipo,
+            "id_empleado": id_empleado, "link_org": link_org, "anio": anio,
+            "estado": _opcion(f.get("estado"), ESTADOS_OKR, "Nuevo", "Estado"),
+        }
+
+    def _tarea(self, f):
+        id_empleado = self._id_empleado(f["email"]) if f.get("email") else None
+        link_okr = self._buscar_okr(f["link_okr"], "link_okr", id_empleado=id_empleado, anio=self.anio)
+        return {
+            "nombre": f["nombre"],
+            "estado": _opcion(f.get("estado"), ESTADOS_TAREA, "Pendiente", "Estado"),
+            "link_okr": link_okr,
+            # Como en el formulario: la tarea es de quien la registra, por defecto el dueño del OKR
+            "id_empleado": id_empleado if id_empleado is not None else self.okrs[link_okr][1],
+        }
+
+    # --- INSERCIÓN ---
+    def _hashear(self, registros):
+        # PBKDF2 suelta el GIL: los hashes se calculan en paralelo, uno por
+        # contraseña distinta (lo habitual es una temporal común a todos)
+        faltan = [r["password"] for r in registros if r["password"] not in self._hash_de]
+        faltan = list(dict.fromkeys(faltan))
+        with ThreadPoolExecutor() as pool:
+            hashes = pool.map(lambda p: hash_password(p, iteraciones=ITERACIONES_TEMPORAL), faltan)
+            self._hash_de.update(zip(faltan, hashes))
+        for r in registros:
+            r["password"] = self._hash_de[r["password"]]
+
+    def _insertar(self, tabla, validas, resultado):
+        registros = [r for _, r in validas]
+        if tabla == tablaEmpleados:
+            self._hashear(registros)
+        insertado = insert_bulk(tabla, registros, self.tam_lote)
+        fallidas = {id(r): mensaje for r, mensaje in insertado["errores"]}
+        for numero, r in validas:
+            if id(r) in fallidas:
+                resultado["errores"].append((numero, fallidas[id(r)]))
+                # Libera lo reservado al validar
+                if tabla == tablaEmpleados:
+                    self.emails.pop(_clave(r["email"]), None)
+                elif tabla == tablaAreas:
+                    self.areas.pop(_clave(r["nombre"]), None)
+        for fila in insertado["filas"]:
+            self._registrar(tabla, fila)
+        resultado["ok"] += insertado["ok"]
+
+    def importar(self, tabla, filas, total=None):
+        """filas: iterable de (nº de fila, dict). Devuelve {"ok": n, "errores": [(fila, mensaje)]}."""
+        validar = {tablaAreas: self._area, tablaEmpleados: self._empleado,
+                   tablaOkrs: self._okr, tablaTareas: self._tarea}[tabla]
+        resultado = {"ok": 0, "errores": []}
+        diferidas, procesadas = [], 0
+        for lote in _lotes(filas, self.tam_lote):
+            if procesadas == 0:
+                faltan = [c for c in OBLIGATORIAS[tabla] if c not in lote[0][1]]
+                if faltan:
+                    resultado["errores"].append((1, f"Faltan columnas: {', '.join(faltan)}"))
+                    return resultado
+            diferidas += self._importar_lote(tabla, lote, validar, resultado, diferir=True)
+            procesadas += len(lote)
+            if self.al_avanzar:
+                self.al_avanzar(tabla, procesadas, total)
+        # Filas que apuntaban a otras más abajo del fichero (p.ej. link_org a un
+        # corporativo listado después): un segundo intento, ya sin diferir
+        if diferidas:
+            self._importar_lote(tabla, diferidas, validar, resultado, diferir=False)
+        resultado["errores"].sort()
+        return resultado
+
+    def _importar_lote(self, tabla, lote, validar, resultado, diferir):
+        validas, diferidas = [], []
+        for numero, fila in lote:
+            vacias = [c for c in OBLIGATORIAS[tabla] if not fila.get(c)]
+            if vacias:
+                resultado["errores"].append((numero, f"Falta {', '.join(vacias)}"))
+                continue
+            try:
+                validas.append((numero, validar(fila)))
+            except _Pendiente as e:
+                if diferir:
+                    diferidas.append((numero, fila))
+                else:
+                    resultado["errores"].append((numero, str(e)))
+            except ValueError as e:
+                resultado["errores"].append((numero, str(e)))
+        if validas:
+            self._insertar(tabla, validas, resultado)
+        return diferidas
+
@@ -0,0 +1,141 @@
+import streamlit as st
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+# --- INSTRUMENTACIÓN ---
+# Latencia, filas y bytes de cada execute() contra Supabase y duración de cada
+# render de fragmento. Desactivada, cada llamada cuesta un if: ni cronómetro,
+# ni serialización para contar bytes, ni lock.
+ULTIMOS_EVENTOS = 200
+log = logging.getLogger("okrs.metricas")
+OPERACIONES = ("select", "insert", "upsert", "update", "delete")
+
+
+@st.cache_resource
+def _registro():
+    return {
+        "lock": threading.Lock(),
+        "activo": os.getenv("OKR_METRICAS") == "1",
+        "agregados": {},  # (tipo, nombre, operacion) -> {"llamadas", "segundos", "max", "filas", "bytes"}
+        "eventos": deque(maxlen=ULTIMOS_EVENTOS),
+    }
+
+def activo():
+    return _registro()["activo"]
+
+def activar(valor=True):
+    _registro()["activo"] = bool(valor)
+
+def reiniciar():
+    registro = _registro()
+    with registro["lock"]:
+        registro["agregados"].clear()
+        registro["eventos"].clear()
+
+def registrar(tipo, nombre, segundos, operacion="", filas=0, bytes_=0):
+    registro = _registro()
+    evento = {"tipo": tipo, "nombre": nombre, "operacion": operacion,
+              "segundos": round(segundos, 6), "filas": filas, "bytes": bytes_}
+    with registro["lock"]:
+        agregado = registro["agregados"].setdefault(
+            (tipo, nombre, operacion), {"llamadas": 0, "segundos": 0.0, "max": 0.0, "filas": 0, "bytes": 0})
+        agregado["llamadas"] += 1
+        agregado["segundos"] += segundos
+        agregado["max"] = max(agregado["max"], segundos)
+        agregado["filas"] += filas
+        agregado["bytes"] += bytes_
+        registro["eventos"].append(evento)
+    log.debug(json.dumps(evento))
+
+# --- SUPABASE ---
+class ConsultaMedida:
+    """Envuelve la cadena de supabase.table(...) y mide su execute()."""
+    def __init__(self, consulta, tabla, operacion="select"):
+        self._consulta = consulta
+        self._tabla = tabla
+        self._operacion = operacion
+
+    def __getattr__(self, nombre):
+        atributo = getattr(self._consulta, nombre)
+        if nombre == "execute":
+            return self._execute
+        if not callable(atributo):
+            return atributo
+
+        @functools.wraps(atributo)
+        def encadenar(*args, **kwargs):
+            operacion = nombre if nombre in OPERACIONES and nombre != "select" else self._operacion
+            return ConsultaMedida(atributo(*args, **kwargs), self._tabla, operacion)
+        return encadenar
+
+    def _execute(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        respuesta = self._consulta.execute(*args, **kwargs)
+        segundos = time.perf_counter() - inicio
+        data = respuesta.data or []
+        registrar("supabase", self._tabla, segundos, self._operacion,
+                  filas=len(data) if isinstance(data, list) else 1,
+                  bytes_=len(json.dumps(data, default=str).encode()))
+        return respuesta
+
+def medir_tabla(consulta, tabla):
+    return ConsultaMedida(consulta, tabla) if activo() else consulta
+
+# --- FRAGMENTOS ---
+def medido(fn):
+    """Decorador (debajo de @st.fragment) que cronometra cada render."""
+    @functools.wraps(fn)
+    def envoltura(*args, **kwargs):
+        if not activo():
+            return fn(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            registrar("fragmento", fn.__name__, time.perf_counter() - inicio)
+    return envoltura
+
+# --- EXPORTACIÓN ---
+def tabla_agregados():
+    with _registro()["lock"]:
+        agregados = dict(_registro()["agregados"])
+    return [
+        {"tipo": tipo, "nombre": nombre, "operacion": operacion, **a,
+         "media_ms": round(1000 * a["segundos"] / a["llamadas"], 2)}
+        for (tipo, nombre, operacion), a in sorted(agregados.items(), key=lambda kv: -kv[1]["segundos"])
+    ]
+
+def _etiquetas(fila):
+    if fila["tipo"] == "supabase":
+        return f'{{tabla="{fila["nombre"]}",operacion="{fila["operacion"]}"}}'
+    return f'{{fragmento="{fila["nombre"]}"}}'
+
+def texto_prometheus():
+    """Volcado en formato de texto de Prometheus."""
+    series = [
+        ("llamadas_total", "counter", "llamadas", "Número de llamadas"),
+        ("segundos_total", "counter", "segundos", "Tiempo acumulado en segundos"),
+        ("segundos_max", "gauge", "max", "Llamada más lenta en segundos"),
+        ("filas_total", "counter", "filas", "Filas devueltas"),
+        ("bytes_total", "counter", "bytes", "Bytes de payload devueltos"),
+    ]
+    filas = tabla_agregados()
+    lineas = []
+    for tipo in ("supabase", "fragmento"):
+        del_tipo = [f for f in filas if f["tipo"] == tipo]
+        for sufijo, clase, campo, ayuda in series:
+            if tipo == "fragmento" and campo in ("filas", "bytes"):
+                continue
+            metrica = f"okr_{tipo}_{sufijo}"
+            lineas += [f"# HELP {metrica} {ayuda}", f"# TYPE {metrica} {clase}"]
+            lineas += [f"{metrica}{_etiquetas(f)} {f[campo]}" for f in del_tipo]
+    return "\n".join(lineas) + "\n"
+
+def ultimos_eventos():
+    with _registro()["lock"]:
+        return list(_registro()["eventos"])
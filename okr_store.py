@@ -0,0 +1,108 @@
+import pandas as pd
+from functools import cached_property
+from progreso import progreso_por_okr, progreso_por_empleado
+from busqueda import IndiceEmpleados
+
+# --- ÍNDICE EN MEMORIA EMPLEADO -> OKRS -> TAREAS ---
+# Se construye una vez por snapshot de datos; las vistas hacen búsquedas O(1)
+# en lugar de recorrer los DataFrames con máscaras dentro de bucles.
+
+def _indice(df, columnas):
+    # clave -> posiciones de fila (los IDs ya vienen tipados desde db.aplicar_esquema)
+    if df.empty or any(c not in df.columns for c in columnas):
+        return {}
+    return df.groupby(columnas if len(columnas) > 1 else columnas[0], sort=False, observed=True).indices
+
+
+class OkrStore:
+    def __init__(self, empleados_df=None, okrs_df=None, tareas_df=None, areas_df=None, agregados=None):
+        self.empleados = empleados_df if empleados_df is not None else pd.DataFrame()
+        self.okrs = okrs_df if okrs_df is not None else pd.DataFrame()
+        self.tareas = tareas_df if tareas_df is not None else pd.DataFrame()
+        self.areas = areas_df if areas_df is not None else pd.DataFrame()
+
+        self._empleado_por_id = _indice(self.empleados, ["id"])
+        self._empleados_por_area = _indice(self.empleados, ["area"])
+        self._okr_por_id = _indice(self.okrs, ["id"])
+        self._okrs_por_empleado = _indice(self.okrs, ["id_empleado"])
+        self._okrs_por_empleado_anio = _indice(self.okrs, ["id_empleado", "anio"])
+        self._okrs_por_tipo_anio = _indice(self.okrs, ["tipo", "anio"])
+        self._okrs_por_tipo = _indice(self.okrs, ["tipo"])
+        self._personales_por_link_org = _indice(self.okrs, ["link_org"])
+        self._tareas_por_okr = _indice(self.tareas, ["link_okr"])
+        self._progreso_equipo = {}
+        # progreso.AgregadosProgreso del snapshot: si está, el progreso sale de ahí
+        self.agregados = agregados
+
+    @staticmethod
+    def _filas(df, indice, clave):
+        posiciones = indice.get(clave)
+        return df.iloc[posiciones] if posiciones is not None else df.iloc[0:0]
+
+    def empleado(self, id_empleado):
+        filas = self._filas(self.empleados, self._empleado_por_id, id_empleado)
+        return filas.iloc[0] if not filas.empty else None
+
+    def empleados_de_area(self, area):
+        return self._filas(self.empleados, self._empleados_por_area, area)
+
+    @cached_property
+    def busqueda(self):
+        """Índice de búsqueda por nombre/email (busqueda.IndiceEmpleados) de esta versión."""
+        return IndiceEmpleados(self.empleados)
+
+    def okr(self, id_okr):
+        filas = self._filas(self.okrs, self._okr_por_id, id_okr)
+        return filas.iloc[0] if not filas.empty else None
+
+    def okrs_de_empleado(self, id_empleado, anio=None):
+        if anio is None:
+            return self._filas(self.okrs, self._okrs_por_empleado, id_empleado)
+        return self._filas(self.okrs, self._okrs_por_empleado_anio, (id_empleado, anio))
+
+    def corporativos(self, anio=None):
+        if anio is None:
+            return self._filas(self.okrs, self._okrs_por_tipo, "Organizacion")
+        return self._filas(self.okrs, self._okrs_por_tipo_anio, ("Organizacion", anio))
+
+    def personales_de(self, id_okr_corporativo):
+        """OKRs personales vinculados (link_org) a un OKR corporativo."""
+        return self._filas(self.okrs, self._personales_por_link_org, id_okr_corporativo)
+
+    def tareas_de_okr(self, id_okr):
+        return self._filas(self.tareas, self._tareas_por_okr, id_okr)
+
+    @cached_property
+    def progreso_okrs(self):
+        """Progreso (0-1) por OKR, indexado por id."""
+        por_okr = progreso_por_okr(self.okrs, self.tareas)
+        return pd.Series(por_okr["progreso"].to_numpy(), index=por_okr["id"])
+
+    def progreso_okr(self, id_okr):
+        if self.agregados is not None:
+            return self.agregados.progreso_okr(id_okr)
+        return float(self.progreso_okrs.get(id_okr, 0.0))
+
+    def rollup_corporativo(self, id_okr_corporativo):
+        """Progreso ponderado y contribuyentes de un OKR corporativo (ver progreso.AgregadosProgreso)."""
+        if self.agregados is None:
+            return {"progreso": 0.0, "contribuyentes": 0, "okrs": 0, "tareas": 0}
+        return self.agregados.rollup_corporativo(id_okr_corporativo)
+
+    def rollup_por_area(self, id_okr_corporativo):
+        def area_de(id_empleado):
+            empleado = self.empleado(id_empleado)
+            return empleado["area"] if empleado is not None and pd.notna(empleado["area"]) else None
+        if self.agregados is None:
+            return pd.DataFrame(columns=["area", "contribuyentes", "okrs", "tareas", "progreso"])
+        return self.agregados.rollup_por_area(id_okr_corporativo, area_de)
+
+    def progreso_equipo(self, anio):
+        """n_okrs y progreso medio por empleado para un año (calculado una vez por año)."""
+        if self.agregados is not None:
+            return self.agregados.progreso_equipo(anio)
+        if anio not in self._progreso_equipo:
+            okrs_anio = self.okrs[self.okrs["anio"] == anio] if not self.okrs.empty else self.okrs
+            self._progreso_equipo[anio] = progreso_por_empleado(progreso_por_okr(okrs_anio, self.tareas), claves=["id_empleado"])
+        return self._progreso_equipo[anio]
+
@@ -0,0 +1,341 @@
+import pandas as pd
+from variables import puntosEstadoTarea, tablaOkrs, tablaTareas
+
+# --- MOTOR DE PROGRESO VECTORIZADO ---
+# Una sola pasada para todo el equipo: estado -> puntos, agrupado por OKR,
+# unido a okrs y agrupado por empleado. Sustituye los iterrows anidados.
+
+def progreso_por_okr(okrs_df, tareas_df):
+    """Una fila por OKR con n_tareas, puntos y progreso (0-1). Un OKR sin tareas vale 0."""
+    columnas = ["id", "id_empleado", "anio"]
+    if okrs_df.empty:
+        return pd.DataFrame(columns=columnas + ["n_tareas", "puntos", "progreso"])
+
+    res = okrs_df[columnas].copy()
+    if tareas_df.empty:
+        res["n_tareas"] = 0
+        res["puntos"] = 0.0
+    else:
+        # Estados desconocidos suman 0 pero cuentan en el total, igual que antes
+        tareas = pd.DataFrame({
+            "link_okr": tareas_df["link_okr"],
+            "puntos": tareas_df["estado"].map(puntosEstadoTarea).astype(float).fillna(0.0),
+        })
+        por_okr = tareas.groupby("link_okr")["puntos"].agg(n_tareas="size", puntos="sum")
+        res = res.join(por_okr, on="id")
+        res["n_tareas"] = res["n_tareas"].fillna(0).astype(int)
+        res["puntos"] = res["puntos"].fillna(0.0)
+
+    res["progreso"] = (res["puntos"] / res["n_tareas"].where(res["n_tareas"] > 0)).fillna(0.0).clip(0.0, 1.0)
+    return res
+
+def progreso_por_empleado(progreso_okrs, claves=("id_empleado", "anio")):
+    """Promedio del progreso de los OKRs y número de OKRs por empleado (y año)."""
+    claves = list(claves)
+    if progreso_okrs.empty:
+        return pd.DataFrame(columns=claves + ["n_okrs", "progreso"]).set_index(claves)
+    return progreso_okrs.groupby(claves, observed=True).agg(n_okrs=("id", "size"), progreso=("progreso", "mean"))
+
+# --- AGREGADOS INCREMENTALES ---
+# Conteos de tareas por OKR y estado, por año/empleado el número de OKRs y la
+# suma de su progreso, y el rollup de cada OKR corporativo (link_org) por
+# empleado contribuyente. Solo una carga o resincronización completa los
+# reconstruye; cada tarea u OKR guardado, borrado o sincronizado da una copia
+# nueva con el cambio (con()), y la versión anterior, que siguen leyendo los
+# snapshots viejos, no se toca. La copia es perezosa: los mapas exteriores son
+# _Capas (lo compartido más los cambios propios) y de los internos solo se
+# duplican las entradas que el cambio toca.
+COMPACTAR = 2048   # cambios acumulados a partir de los cuales _Capas se aplana
+_FALTA = object()
+_BORRADO = object()
+
+def _valor(x):
+    return None if x is None or pd.isna(x) else x
+
+def _id(x):
+    """Como aplicar_esquema con las columnas Int64: "12", 12 y 12.0 quedan en 12."""
+    x = _valor(x)
+    if x is None:
+        return None
+    try:
+        return int(float(x))
+    except (TypeError, ValueError):
+        return None
+
+def _objetos(serie):
+    return serie.astype(object).where(serie.notna(), None).tolist()
+
+def _objetos_df(df):
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+class _Capas:
+    """Mapa de una versión: `base` (compartida con las versiones anteriores, no se
+    modifica nunca) más `cambios` propios, con _BORRADO para las claves quitadas.
+    siguiente() copia solo los cambios, O(cambios) en vez de O(tamaño); con más
+    de COMPACTAR se aplana en una base nueva, O(n) una vez cada COMPACTAR."""
+    __slots__ = ("base", "cambios")
+
+    def __init__(self, base, cambios=None):
+        self.base = base
+        self.cambios = cambios if cambios is not None else {}
+
+    def siguiente(self):
+        if len(self.cambios) > COMPACTAR:
+            return _Capas(self.aplanar())
+        return _Capas(self.base, dict(self.cambios))
+
+    def aplanar(self):
+        plano = dict(self.base)
+        for clave, valor in self.cambios.items():
+            if valor is _BORRADO:
+                plano.pop(clave, None)
+            else:
+                plano[clave] = valor
+        return plano
+
+    def get(self, clave, por_defecto=None):
+        valor = self.cambios.get(clave, _FALTA)
+        if valor is _FALTA:
+            return self.base.get(clave, por_defecto)
+        return por_defecto if valor is _BORRADO else valor
+
+    def __contains__(self, clave):
+        return self.get(clave, _FALTA) is not _FALTA
+
+    def __getitem__(self, clave):
+        valor = self.get(clave, _FALTA)
+        if valor is _FALTA:
+            raise KeyError(clave)
+        return valor
+
+    def __setitem__(self, clave, valor):
+        self.cambios[clave] = valor
+
+    def pop(self, clave, por_defecto=None):
+        valor = self.get(clave, _FALTA)
+        if valor is _FALTA:
+            return por_defecto
+        self.cambios[clave] = _BORRADO
+        return valor
+
+    def __delitem__(self, clave):
+        if self.pop(clave, _FALTA) is _FALTA:
+            raise KeyError(clave)
+
+    # Recorrerlo (dict(capas), items()) lo aplana: solo lo hacen las consultas
+    def keys(self):
+        return self.aplanar().keys()
+
+    def items(self):
+        return self.aplanar().items()
+
+    def values(self):
+        return self.aplanar().values()
+
+    def __iter__(self):
+        return iter(self.aplanar())
+
+    def __len__(self):
+        return len(self.aplanar())
+
+def _siguiente(mapa):
+    return mapa.siguiente() if isinstance(mapa, _Capas) else _Capas(mapa)
+
+
+class AgregadosProgreso:
+    def __init__(self):
+        self.tareas = {}         # id_tarea -> (link_okr, estado)
+        self.conteos = {}        # id_okr -> {estado: n_tareas}
+        self.okrs = {}           # id_okr -> (id_empleado, anio, link_org)
+        self.empleados = {}      # anio -> {id_empleado: (n_okrs, suma_progreso)}
+        self.corporativos = {}   # id_okr_corporativo -> {id_empleado: (n_okrs, puntos, n_tareas)}
+        self._propios = None     # entradas internas ya copiadas (None: todas son de esta instancia)
+
+    @classmethod
+    def desde_tablas(cls, okrs_df, tareas_df, por_okr_cerrados=None):
+        """`por_okr_cerrados`: progreso_por_okr ya calculado (cache_disco) de OKRs
+        que no cambian; solo se calcula el del resto."""
+        agregados = cls()
+        if not tareas_df.empty:
+            estados, links = _objetos(tareas_df["estado"]), _objetos(tareas_df["link_okr"])
+            agregados.tareas = dict(zip(tareas_df["id"].tolist(), zip(links, estados)))
+            conteo = pd.DataFrame({"link_okr": links, "estado": estados}).value_counts(dropna=False)
+            for (link, estado), n in conteo.items():
+                if _valor(link) is not None:
+                    agregados.conteos.setdefault(link, {})[_valor(estado)] = int(n)
+        if okrs_df.empty:
+            return agregados
+
+        agregados.okrs = dict(zip(okrs_df["id"].tolist(), zip(
+            _objetos(okrs_df["id_empleado"]), _objetos(okrs_df["anio"]), _objetos(okrs_df["link_org"]))))
+        if por_okr_cerrados is not None and not por_okr_cerrados.empty:
+            pendientes = okrs_df[~okrs_df["id"].isin(por_okr_cerrados["id"])]
+            tareas_pendientes = tareas_df[tareas_df["link_okr"].isin(pendientes["id"])] if not tareas_df.empty else tareas_df
+            por_okr = pd.concat([por_okr_cerrados[por_okr_cerrados["id"].isin(okrs_df["id"])],
+                                 progreso_por_okr(pendientes, tareas_pendientes).astype({"anio": "Int64"})],
+                                ignore_index=True)
+        else:
+            por_okr = progreso_por_okr(okrs_df, tareas_df)
+        por_okr = por_okr.dropna(subset=["id_empleado"])
+        suma = por_okr.groupby(["anio", "id_empleado"], observed=True)["progreso"].agg(["size", "sum"])
+        for (anio, id_empleado), n, total in zip(suma.index, suma["size"].tolist(), suma["sum"].tolist()):
+            agregados.empleados.setdefault(anio, {})[id_empleado] = (n, total)
+
+        # Árbol corporativo -> OKR personal -> tareas, agregado por contribuyente
+        por_okr["link_org"] = por_okr["id"].map(okrs_df.set_index("id")["link_org"])
+        vinculados = por_okr.dropna(subset=["link_org"])
+        rollup = vinculados.groupby(["link_org", "id_empleado"]).agg(
+            n_okrs=("id", "size"), puntos=("puntos", "sum"), n_tareas=("n_tareas", "sum"))
+        for (link, id_empleado), n, puntos, n_tareas in zip(
+                rollup.index, rollup["n_okrs"].tolist(), rollup["puntos"].tolist(), rollup["n_tareas"].tolist()):
+            agregados.corporativos.setdefault(link, {})[id_empleado] = (n, puntos, n_tareas)
+        return agregados
+
+    # --- consultas O(1) ---
+    def _puntos(self, id_okr):
+        conteo = self.conteos.get(id_okr)
+        if not conteo:
+            return 0.0, 0
+        return sum(puntosEstadoTarea.get(estado, 0.0) * k for estado, k in conteo.items()), sum(conteo.values())
+
+    def progreso_okr(self, id_okr):
+        puntos, n = self._puntos(id_okr)
+        return min(1.0, max(0.0, puntos / n)) if n else 0.0
+
+    def progreso_empleado(self, id_empleado, anio):
+        """(n_okrs, progreso medio) del empleado en el año."""
+        n, suma = self.empleados.get(anio, {}).get(id_empleado, (0, 0.0))
+        return n, (suma / n if n else 0.0)
+
+    def progreso_equipo(self, anio):
+        """Mismo formato que progreso_por_empleado(..., claves=["id_empleado"])."""
+        del_anio = dict(self.empleados.get(anio, {}))
+        indice = pd.Index(list(del_anio.keys()), name="id_empleado")
+        return pd.DataFrame({
+            "n_okrs": [n for n, _ in del_anio.values()],
+            "progreso": [min(1.0, max(0.0, suma / n)) if n else 0.0 for n, suma in del_anio.values()],
+        }, index=indice)
+
+    def rollup_corporativo(self, id_okr_corporativo):
+        """Progreso ponderado por tareas de todos los OKRs personales vinculados,
+        con el número de empleados que contribuyen y de OKRs vinculados."""
+        por_empleado = dict(self.corporativos.get(id_okr_corporativo, {}))
+        puntos = sum(p for _, p, _ in por_empleado.values())
+        n_tareas = sum(t for _, _, t in por_empleado.values())
+        return {
+            "progreso": min(1.0, max(0.0, puntos / n_tareas)) if n_tareas else 0.0,
+            "contribuyentes": len(por_empleado),
+            "okrs": sum(n for n, _, _ in por_empleado.values()),
+            "tareas": n_tareas,
+        }
+
+    def rollup_por_area(self, id_okr_corporativo, area_de):
+        """Mismo rollup partido por área; `area_de(id_empleado)` da el área actual."""
+        columnas = ["area", "contribuyentes", "okrs", "tareas", "puntos"]
+        filas = [(area_de(e) or "Sin Área", 1, n, t, p)
+                 for e, (n, p, t) in dict(self.corporativos.get(id_okr_corporativo, {})).items()]
+        if not filas:
+            return pd.DataFrame(columns=columnas + ["progreso"])
+        por_area = pd.DataFrame(filas, columns=columnas).groupby("area", as_index=False).sum()
+        por_area["progreso"] = (por_area["puntos"] / por_area["tareas"].where(por_area["tareas"] > 0)).fillna(0.0).clip(0.0, 1.0)
+        return por_area.drop(columns="puntos").sort_values("progreso", ascending=False, ignore_index=True)
+
+    # --- deltas ---
+    def con(self, tabla, cambios=(), borrados=()):
+        """Copia con las filas `cambios` (dicts o DataFrame, upsert) y los ids
+        `borrados` de `tabla` aplicados. Las filas pueden venir tal cual de
+        Supabase (link_okr en texto)."""
+        nuevo = AgregadosProgreso()
+        for nombre in ("tareas", "okrs", "conteos", "empleados", "corporativos"):
+            setattr(nuevo, nombre, _siguiente(getattr(self, nombre)))
+        nuevo._propios = set()
+        if isinstance(cambios, pd.DataFrame):
+            cambios = _objetos_df(cambios)
+        for id_fila in borrados:
+            nuevo.aplicar(tabla, "delete", {"id": id_fila})
+        for fila in cambios:
+            nuevo.aplicar(tabla, "upsert", fila)
+        return nuevo
+
+    def _propio(self, nombre, clave):
+        """self.<nombre>[clave] para modificarlo: la primera vez se copia, porque
+        el original puede ser de la versión anterior."""
+        externo = getattr(self, nombre)
+        if self._propios is None:
+            return externo.setdefault(clave, {})
+        if (nombre, clave) not in self._propios:
+            # También por capas: empleados[anio] tiene a todos los empleados del año
+            externo[clave] = _siguiente(externo.get(clave, {}))
+            self._propios.add((nombre, clave))
+        return externo[clave]
+
+    def _ajustar_empleado(self, anio, id_empleado, n_okrs, suma):
+        if id_empleado is None or id_empleado not in self.empleados.get(anio, {}) and n_okrs <= 0:
+            return
+        del_anio = self._propio("empleados", anio)
+        n, total = del_anio.get(id_empleado, (0, 0.0))
+        if n + n_okrs <= 0:
+            del del_anio[id_empleado]
+        else:
+            del_anio[id_empleado] = (n + n_okrs, total + suma)
+
+    def _ajustar_corporativo(self, link_org, id_empleado, n_okrs, puntos, n_tareas):
+        if link_org is None or id_empleado is None:
+            return
+        por_empleado = self._propio("corporativos", link_org)
+        n, p, t = por_empleado.get(id_empleado, (0, 0.0, 0))
+        if n + n_okrs <= 0:
+            por_empleado.pop(id_empleado, None)
+        else:
+            por_empleado[id_empleado] = (n + n_okrs, p + puntos, t + n_tareas)
+
+    def _contar(self, id_okr, estado, signo):
+        if id_okr is None:
+            return
+        antes = self.progreso_okr(id_okr)
+        conteo = self._propio("conteos", id_okr)
+        conteo[estado] = conteo.get(estado, 0) + signo
+        if conteo[estado] <= 0:
+            del conteo[estado]
+        id_empleado, anio, link_org = self.okrs.get(id_okr, (None, None, None))
+        if id_empleado in self.empleados.get(anio, {}):
+            self._ajustar_empleado(anio, id_empleado, 0, self.progreso_okr(id_okr) - antes)
+        self._ajustar_corporativo(link_org, id_empleado, 0, signo * puntosEstadoTarea.get(estado, 0.0), signo)
+
+    def aplicar_tarea(self, accion, fila):
+        id_tarea = _id(fila.get("id"))
+        previa = self.tareas.pop(id_tarea, None)
+        if previa is not None:
+            self._contar(*previa, -1)
+        if accion == "delete":
+            return
+        # Una actualización puede traer solo las columnas cambiadas
+        link = _id(fila["link_okr"]) if "link_okr" in fila else (previa[0] if previa else None)
+        estado = _valor(fila["estado"]) if "estado" in fila else (previa[1] if previa else None)
+        self.tareas[id_tarea] = (link, estado)
+        self._contar(link, estado, 1)
+
+    def aplicar_okr(self, accion, fila):
+        id_okr = _id(fila.get("id"))
+        progreso = self.progreso_okr(id_okr)
+        puntos, n_tareas = self._puntos(id_okr)
+        previa = self.okrs.pop(id_okr, None)
+        if previa is not None:
+            self._ajustar_empleado(previa[1], previa[0], -1, -progreso)
+            self._ajustar_corporativo(previa[2], previa[0], -1, -puntos, -n_tareas)
+        if accion == "delete":
+            return
+
+        def actual(columna, posicion):
+            return _id(fila[columna]) if columna in fila else (previa[posicion] if previa else None)
+        id_empleado, anio, link_org = actual("id_empleado", 0), actual("anio", 1), actual("link_org", 2)
+        self.okrs[id_okr] = (id_empleado, anio, link_org)
+        self._ajustar_empleado(anio, id_empleado, 1, progreso)
+        self._ajustar_corporativo(link_org, id_empleado, 1, puntos, n_tareas)
+
+    def aplicar(self, tabla, accion, fila):
+        """Aplica el cambio sobre esta instancia; fuera de con() solo en una recién construida."""
+        if tabla == tablaTareas:
+            self.aplicar_tarea(accion, fila)
+        elif tabla == tablaOkrs:
+            self.aplicar_okr(accion, fila)
@@ -0,0 +1,187 @@
+import streamlit as st
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from db import (COLUMNAS_TABLA, MAX_CARGAS_CONCURRENTES, CACHE_TTL, aplicar_delta, aplicar_esquema, leer_cambios,
+                leer_paginado, marca_de_agua, mezclar_cambios, sincronizar_replica, sincronizar_tabla)
+from okr_store import OkrStore
+import cache_disco
+from progreso import AgregadosProgreso
+from variables import tablaEmpleados, tablaOkrs, tablaTareas, tablaAreas
+
+# --- SNAPSHOT COMPARTIDO POR PROCESO ---
+# Una sola copia de las tablas para todas las sesiones (st.cache_resource).
+# El snapshot nunca se modifica: una escritura o una sincronización crean uno
+# nuevo con version+1 y se cambia el puntero de forma atómica. Cada sesión
+# solo guarda la versión que vio.
+# Es por proceso, no por usuario: sustituye a las consultas acotadas por rol
+# (el empleado ya no pide solo sus OKRs a Supabase). El proceso guarda las
+# tablas enteras una vez, y cada sesión filtra en memoria con el OkrStore.
+TODAS = (tablaEmpleados, tablaOkrs, tablaTareas, tablaAreas)
+SYNC_CADA = CACHE_TTL  # segundos entre sincronizaciones incrementales automáticas
+log = logging.getLogger("okrs.snapshot")
+# Tiempos (en segundos) de la última carga de cada tabla al snapshot: caché en
+# disco más lo cambiado desde su marca, o la tabla entera desde Supabase.
+tiempos_carga = {}
+
+
+class Snapshot:
+    def __init__(self, version, tablas, marcas, agregados=None):
+        self.version = version
+        self.tablas = MappingProxyType(dict(tablas))
+        self.marcas = MappingProxyType(dict(marcas))
+        self._agregados = agregados
+        self._store = None
+
+    @property
+    def agregados(self):
+        # Se construyen una vez desde okrs + tareas y luego viajan de versión en
+        # versión: publicar() y refrescar() pasan a la siguiente una copia con
+        # las filas cambiadas aplicadas, en vez de recalcular
+        if self._agregados is None and tablaOkrs in self.tablas and tablaTareas in self.tablas:
+            okrs, tareas = self.tablas[tablaOkrs], self.tablas[tablaTareas]
+            # El progreso de los años cerrados sale del disco y se calcula una sola vez
+            try:
+                cache_disco.guardar_progreso(okrs, tareas)
+                cerrados = cache_disco.leer_progreso()
+            except Exception as e:
+                # Como en _persistir: sin caché se calcula todo desde las tablas
+                log.warning(f"No se pudo usar el progreso en disco: {e}")
+                cerrados = None
+            self._agregados = AgregadosProgreso.desde_tablas(okrs, tareas, cerrados)
+        return self._agregados
+
+    @property
+    def store(self):
+        # Un OkrStore por versión, compartido por todas las sesiones
+        if self._store is None:
+            self._store = OkrStore(*(self.tablas.get(t) for t in TODAS), agregados=self.agregados)
+        return self._store
+
+    def con(self, tablas, marcas=None, agregados=None):
+        """Nuevo snapshot (version+1) con `tablas` reemplazadas. Sin `agregados`
+        se conservan los actuales, salvo que cambien okrs o tareas."""
+        if agregados is None and not {tablaOkrs, tablaTareas} & set(tablas):
+            agregados = self._agregados
+        return Snapshot(self.version + 1, {**self.tablas, **tablas}, {**self.marcas, **(marcas or {})}, agregados)
+
+
+@st.cache_resource
+def _estado():
+    return {"lock": threading.RLock(), "snapshot": Snapshot(0, {}, {}), "sincronizado": time.monotonic()}
+
+def _cargar(tabla):
+    """(df, marca). Con caché en disco: lo guardado más lo cambiado desde su marca;
+    si no, carga completa."""
+    inicio = time.perf_counter()
+    try:
+        en_disco = cache_disco.leer_tabla(tabla)
+    except Exception as e:
+        # Parquet corrupto o ilegible: se carga de Supabase como sin caché
+        log.warning(f"No se pudo leer la caché en disco de {tabla}: {e}")
+        en_disco = None
+    if en_disco is not None and en_disco[1] is not None:
+        df, marca = sincronizar_tabla(en_disco[0], tabla, en_disco[1])
+    else:
+        # Directo a Supabase: pasar por st.cache_data guardaría una segunda copia
+        df = aplicar_esquema(tabla, leer_paginado(tabla, COLUMNAS_TABLA[tabla]))
+        marca = marca_de_agua(df)
+    tiempos_carga[tabla] = time.perf_counter() - inicio
+    log.info(f"{tabla}: {len(df)} filas en {tiempos_carga[tabla]:.3f} s")
+    return df, marca
+
+def _persistir(snap, tablas):
+    try:
+        cache_disco.guardar_tablas({t: snap.tablas[t] for t in tablas}, snap.marcas, snap.tablas.get(tablaOkrs))
+    except Exception as e:
+        # La caché en disco es una optimización: si falla, la app sigue
+        log.warning(f"No se pudo guardar la caché en disco: {e}")
+
+def actual(tablas=TODAS):
+    """Snapshot vigente con `tablas` cargadas; las que falten se cargan una vez por proceso."""
+    estado = _estado()
+    snap = estado["snapshot"]
+    if any(t not in snap.tablas for t in tablas):
+        with estado["lock"]:
+            snap = estado["snapshot"]
+            faltan = [t for t in tablas if t not in snap.tablas]
+            if faltan:
+                # Cada hilo lleva el contexto de la sesión: las métricas y cualquier
+                # st.* dentro de la carga lo necesitan
+                ctx = get_script_run_ctx()
+                with ThreadPoolExecutor(
+                    max_workers=min(MAX_CARGAS_CONCURRENTES, len(faltan)),
+                    initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx),
+                ) as pool:
+                    cargadas = dict(zip(faltan, pool.map(_cargar, faltan)))
+                snap = snap.con({t: df for t, (df, _) in cargadas.items()},
+                                {t: marca for t, (_, marca) in cargadas.items()})
+                estado["snapshot"] = snap
+                _persistir(snap, faltan)
+    elif time.monotonic() - estado["sincronizado"] > SYNC_CADA:
+        snap = refrescar(esperar=False)
+    st.session_state.version_snapshot_runtime = snap.version
+    return snap
+
+def refrescar(esperar=True):
+    """Sincronización incremental (db.sincronizar_tabla) de todas las tablas cargadas.
+    Con esperar=False, si otro hilo ya está sincronizando no se repite."""
+    estado = _estado()
+    if not estado["lock"].acquire(blocking=esperar):
+        return estado["snapshot"]
+    try:
+        sincronizar_replica()
+        snap = estado["snapshot"]
+        tablas, marcas = {}, {}
+        agregados, completa = snap._agregados, False
+        for tabla, df in snap.tablas.items():
+            marca = snap.marcas.get(tabla)
+            if marca is None:
+                # Sin marca no hay deltas: carga completa y los agregados se reconstruyen
+                nuevo, marca = sincronizar_tabla(df, tabla, None)
+                completa = completa or tabla in (tablaOkrs, tablaTareas)
+            else:
+                cambios, borrados = leer_cambios(tabla, marca)
+                nuevo, marca = mezclar_cambios(df, tabla, marca, cambios, borrados)
+                if nuevo is not df and agregados is not None and tabla in (tablaOkrs, tablaTareas):
+                    agregados = agregados.con(tabla, cambios, borrados)
+            if nuevo is not df and not (nuevo.empty and df.empty):
+                tablas[tabla], marcas[tabla] = nuevo, marca
+        if tablas:
+            estado["snapshot"] = snap.con(tablas, marcas, None if completa else agregados)
+            _persistir(estado["snapshot"], list(tablas))
+        estado["sincronizado"] = time.monotonic()
+        return estado["snapshot"]
+    finally:
+        estado["lock"].release()
+
+def publicar(tabla, accion, fila):
+    """Aplica una fila ya confirmada por Supabase al snapshot compartido."""
+    estado = _estado()
+    with estado["lock"]:
+        snap = estado["snapshot"]
+        if tabla in snap.tablas:
+            # Los agregados de `snap` no se tocan: los siguen leyendo las sesiones en esa versión
+            agregados = snap._agregados
+            if agregados is not None and tabla in (tablaOkrs, tablaTareas):
+                agregados = (agregados.con(tabla, borrados=[fila.get("id")]) if accion == "delete"
+                             else agregados.con(tabla, [fila]))
+            estado["snapshot"] = snap.con({tabla: aplicar_delta(snap.tablas[tabla], tabla, accion, fila)}, agregados=agregados)
+
+# --- ESCRITURAS DE LA SESIÓN ---
+def vista(tabla):
+    """La tabla tal como está en el snapshot vigente."""
+    return actual((tabla,)).tablas[tabla]
+
+def escribir(tabla, escribir_fn, accion="upsert"):
+    """Hace la escritura y, si Supabase la confirma, publica en el snapshot
+    compartido la fila que devuelve. No hay estado optimista: la escritura es
+    síncrona dentro del rerun, así que ninguna vista vería un delta pendiente."""
+    fila = escribir_fn()
+    if not fila:
+        return False
+    publicar(tabla, accion, fila)
+    return True
@@ -0,0 +1,3 @@
+-- Login por email (db.load_credencial): una sola fila por índice único.
+-- Las passwords en claro se sustituyen por su hash pbkdf2 en el primer login.
+create unique index if not exists empleados_email_key on empleados (email);
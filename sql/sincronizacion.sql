@@ -0,0 +1,38 @@
+-- Soporte en Supabase para la sincronización incremental (db.sincronizar_tabla):
+--   * updated_at en cada tabla, mantenido por trigger (marca de agua)
+--   * tabla "eliminados" con una lápida por cada fila borrada
+
+create or replace function set_updated_at() returns trigger as $$
+begin
+    new.updated_at = now();
+    return new;
+end
+$$ language plpgsql;
+
+create table if not exists eliminados (
+    tabla text not null,
+    id bigint not null,
+    deleted_at timestamptz not null default now()
+);
+create index if not exists eliminados_tabla_deleted_at on eliminados (tabla, deleted_at);
+
+create or replace function registrar_eliminado() returns trigger as $$
+begin
+    insert into eliminados (tabla, id) values (TG_TABLE_NAME, old.id);
+    return old;
+end
+$$ language plpgsql;
+
+do $$
+declare t text;
+begin
+    foreach t in array array['empleados', 'okrs', 'tareas', 'areas'] loop
+        execute format('alter table %I add column if not exists updated_at timestamptz not null default now()', t);
+        execute format('create index if not exists %I on %I (updated_at)', t || '_updated_at', t);
+        execute format('drop trigger if exists %I on %I', t || '_set_updated_at', t);
+        execute format('create trigger %I before update on %I for each row execute function set_updated_at()', t || '_set_updated_at', t);
+        execute format('drop trigger if exists %I on %I', t || '_registrar_eliminado', t);
+        execute format('create trigger %I after delete on %I for each row execute function registrar_eliminado()', t || '_registrar_eliminado', t);
+    end loop;
+end
+$$;
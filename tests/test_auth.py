@@ -0,0 +1,73 @@
+import unittest
+from unittest import mock
+import auth
+import db
+from auth import ITERACIONES_HASH, check_credentials, hash_password, necesita_rehash, verificar_password
+from backends import SqliteBackend
+from variables import tablaEmpleados
+
+# --- CONTRASEÑAS ---
+
+class TestHash(unittest.TestCase):
+    def test_hash_y_verificacion(self):
+        almacenada = hash_password("secreta", iteraciones=1000)
+        self.assertTrue(almacenada.startswith("pbkdf2_sha256$1000$"))
+        self.assertTrue(verificar_password("secreta", almacenada))
+        self.assertFalse(verificar_password("otra", almacenada))
+        # Sal aleatoria: el mismo password no da el mismo hash
+        self.assertNotEqual(almacenada, hash_password("secreta", iteraciones=1000))
+
+    def test_en_claro_aun_se_acepta(self):
+        self.assertTrue(verificar_password("secreta", "secreta"))
+        self.assertFalse(verificar_password("otra", "secreta"))
+
+    def test_necesita_rehash(self):
+        self.assertTrue(necesita_rehash("secreta"))
+        self.assertTrue(necesita_rehash(hash_password("secreta", iteraciones=1000)))
+        self.assertFalse(necesita_rehash(f"pbkdf2_sha256${ITERACIONES_HASH}$00$00"))
+
+
+# --- LOGIN Y MIGRACIÓN ---
+
+class TestCheckCredentials(unittest.TestCase):
+    def setUp(self):
+        self.backend = SqliteBackend()
+        parche = mock.patch.object(db, "get_backend", lambda: self.backend)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def _alta(self, password):
+        fila, = self.backend.insertar(tablaEmpleados, {"nombre": "Ana", "email": "ana@x.com", "password": password,
+                                                       "rol": "empleado", "area": "IT"})
+        return fila["id"]
+
+    def _guardada(self, id_empleado):
+        return self.backend.leer(tablaEmpleados, filtros=(("eq", "id", id_empleado),))[0]["password"]
+
+    def test_migra_password_en_claro(self):
+        id_empleado = self._alta("secreta")
+        usuario = check_credentials("ana@x.com", "secreta")
+        self.assertEqual(usuario["id"], id_empleado)
+        self.assertNotIn("password", usuario)
+        guardada = self._guardada(id_empleado)
+        self.assertTrue(guardada.startswith(f"pbkdf2_sha256${ITERACIONES_HASH}$"))
+        self.assertTrue(verificar_password("secreta", guardada))
+        # Ya migrada: un segundo login no vuelve a escribir
+        with mock.patch.object(auth, "update_password") as update:
+            self.assertIsNotNone(check_credentials("ana@x.com", "secreta"))
+            update.assert_not_called()
+
+    def test_refuerza_hash_debil(self):
+        id_empleado = self._alta(hash_password("Temporal1", iteraciones=1000))
+        self.assertIsNotNone(check_credentials("ana@x.com", "Temporal1"))
+        self.assertTrue(self._guardada(id_empleado).startswith(f"pbkdf2_sha256${ITERACIONES_HASH}$"))
+
+    def test_password_incorrecta_no_migra(self):
+        id_empleado = self._alta("secreta")
+        self.assertIsNone(check_credentials("ana@x.com", "otra"))
+        self.assertIsNone(check_credentials("nadie@x.com", "secreta"))
+        self.assertEqual(self._guardada(id_empleado), "secreta")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+import backends
+from backends import ReplicaBackend, SqliteBackend
+from variables import tablaTareas
+
+# --- RÉPLICA DE LECTURA ---
+# Principal y réplica en SQLite en memoria. El reloj de backends._ahora se
+# controla para que los cambios queden fuera de MARGEN_REPLICA entre sí.
+
+class Reloj:
+    def __init__(self):
+        self.ahora = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def avanzar(self, segundos=60):
+        self.ahora += timedelta(seconds=segundos)
+
+    def __call__(self):
+        return self.ahora.isoformat()
+
+
+class TestReplicaBackend(unittest.TestCase):
+    def setUp(self):
+        self.reloj = Reloj()
+        parche = mock.patch.object(backends, "_ahora", self.reloj)
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.principal = SqliteBackend()
+        self.principal.insertar(tablaTareas, [{"nombre": f"t{i}", "estado": "Pendiente", "link_okr": 1} for i in range(5)])
+        self.replica = ReplicaBackend(self.principal, SqliteBackend())
+        self.replica.sincronizar()
+
+    def _estados(self, backend):
+        return {f["id"]: f["estado"] for f in backend.leer(tablaTareas)}
+
+    def test_carga_inicial(self):
+        self.assertEqual(self._estados(self.replica), self._estados(self.principal))
+
+    def test_sincroniza_cambios_y_lapidas(self):
+        self.reloj.avanzar()
+        self.principal.actualizar(tablaTareas, {"estado": "Hecho"}, (("eq", "id", 1),))
+        self.principal.borrar(tablaTareas, (("eq", "id", 2),))
+        self.principal.insertar(tablaTareas, {"nombre": "nueva", "estado": "Pendiente", "link_okr": 1})
+        self.replica.sincronizar()
+        self.assertEqual(self._estados(self.replica), self._estados(self.principal))
+        self.assertNotIn(2, self._estados(self.replica))
+
+    def test_escritura_por_la_replica_no_salta_cambios_externos(self):
+        # Cambio externo, luego una escritura por la réplica (updated_at más
+        # reciente en local) y después la sincronización
+        self.reloj.avanzar()
+        self.principal.actualizar(tablaTareas, {"estado": "Hecho"}, (("eq", "id", 1),))
+        self.principal.borrar(tablaTareas, (("eq", "id", 2),))
+        self.reloj.avanzar()
+        self.replica.actualizar(tablaTareas, {"estado": "En curso"}, (("eq", "id", 3),))
+        self.replica.sincronizar()
+        estados = self._estados(self.replica)
+        self.assertEqual(estados, self._estados(self.principal))
+        self.assertEqual(estados[1], "Hecho")
+        self.assertNotIn(2, estados)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import pandas as pd
+from busqueda import IndiceEmpleados, normalizar
+
+# --- ÍNDICE DE BÚSQUEDA DE EMPLEADOS ---
+
+class TestBuscar(unittest.TestCase):
+    def setUp(self):
+        self.indice = IndiceEmpleados(pd.DataFrame({
+            "nombre": ["Ana Pérez", "Luis Gómez", "Pedro Ruiz", "Ana Peralta", "Íñigo Núñez", "Alba Perezagua"],
+            "email": ["ana.perez@x.com", "lgomez@x.com", "pruiz@x.com", "aperalta@x.com", "inunez@x.com", "aperezagua@x.com"],
+            "area": ["Ventas", "IT", "Ventas", "IT", "IT", "IT"],
+        }))
+
+    def _nombres(self, consulta, area=None):
+        return self.indice.buscar(consulta, area).nombre.tolist()
+
+    def test_normalizar(self):
+        self.assertEqual(normalizar("  Íñigo  NÚÑEZ-García "), "inigo nunez garcia")
+        self.assertEqual(normalizar(None), "")
+
+    def test_prefijo(self):
+        # A igual relevancia, por nombre
+        self.assertEqual(self._nombres("per"), ["Alba Perezagua", "Ana Peralta", "Ana Pérez"])
+        # Token exacto antes que prefijo
+        self.assertEqual(self._nombres("perez"), ["Ana Pérez", "Alba Perezagua"])
+
+    def test_plegado_de_tildes(self):
+        self.assertEqual(self._nombres("inigo nunez"), ["Íñigo Núñez"])
+        self.assertEqual(self._nombres("GÓMEZ"), ["Luis Gómez"])
+
+    def test_email(self):
+        self.assertEqual(self._nombres("lgomez"), ["Luis Gómez"])
+
+    def test_filtro_de_area(self):
+        self.assertEqual(self._nombres("ana", area="IT"), ["Ana Peralta"])
+        self.assertEqual(self._nombres("ana", area="No existe"), [])
+
+    def test_parecidos_si_nada_casa(self):
+        self.assertIn("Ana Pérez", self._nombres("perz"))
+        self.assertEqual(self._nombres("gomes"), ["Luis Gómez"])
+        self.assertEqual(self._nombres("perz", area="Ventas"), ["Ana Pérez"])
+        self.assertEqual(self._nombres("xyzw"), [])
+
+    def test_vacio(self):
+        self.assertEqual(self._nombres(""), [])
+        indice = IndiceEmpleados(pd.DataFrame({"nombre": [], "email": [], "area": []}))
+        self.assertEqual(indice.buscar_filas("ana"), [])
+        self.assertEqual(indice.buscar_filas("perz"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+import cache_disco
+import db
+from backends import SqliteBackend
+from benchmarks.datos import ANIOS, generar
+from db import COLUMNAS_TABLA, aplicar_esquema, leer_paginado, sincronizar_tabla
+from progreso import AgregadosProgreso
+from snapshot import Snapshot
+from variables import tablaOkrs, tablaTareas
+
+# --- CACHÉ EN DISCO ---
+# Carpeta temporal y un SQLite en memoria como Supabase. El año en curso es el
+# último de los datos de prueba, así el anterior va a particiones cerradas.
+
+def _ordenada(df):
+    return df.sort_values("id", ignore_index=True)
+
+def _completa(tabla):
+    # Sin pasar por st.cache_data: los cambios se hacen directo en el backend
+    return aplicar_esquema(tabla, leer_paginado(tabla, COLUMNAS_TABLA[tabla]))
+
+
+class TestCacheDisco(unittest.TestCase):
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.backend = SqliteBackend()
+        for tabla, filas in generar(30, semilla=11).items():
+            self.backend.importar(tabla, filas)
+        for parche in (mock.patch.object(cache_disco, "DIR_CACHE", carpeta.name),
+                       mock.patch.object(cache_disco, "anio_actual", lambda: max(ANIOS)),
+                       mock.patch.object(db, "get_backend", lambda: self.backend)):
+            parche.start()
+            self.addCleanup(parche.stop)
+        self.tablas, self.marcas = {}, {}
+        for tabla in (tablaOkrs, tablaTareas):
+            self.tablas[tabla] = _completa(tabla)
+            self.marcas[tabla] = db.marca_de_agua(self.tablas[tabla])
+        cache_disco.guardar_tablas(self.tablas, self.marcas, self.tablas[tablaOkrs])
+
+    def test_ida_y_vuelta(self):
+        for tabla in (tablaOkrs, tablaTareas):
+            df, marca = cache_disco.leer_tabla(tabla)
+            pd.testing.assert_frame_equal(df, _ordenada(self.tablas[tabla]), check_categorical=False)
+            self.assertEqual(marca, self.marcas[tabla])
+        cerradas = os.listdir(os.path.join(cache_disco.DIR_CACHE, tablaTareas))
+        self.assertIn(f"anio={min(ANIOS)}.parquet", cerradas)
+
+    def test_arranque_en_caliente_tras_cambios_fuera(self):
+        # Con la app parada cambian una tarea de un año cerrado, se borra otra
+        # y se crea una nueva: lo guardado + la sincronización = carga completa
+        okrs = self.tablas[tablaOkrs]
+        cerrados = okrs.loc[okrs["anio"].astype("Int64") == min(ANIOS), "id"]
+        tareas = self.tablas[tablaTareas]
+        del_cerrado = tareas[tareas["link_okr"].isin(cerrados)]
+        self.backend.actualizar(tablaTareas, {"estado": "Hecho"}, (("eq", "id", int(del_cerrado["id"].iat[0])),))
+        self.backend.borrar(tablaTareas, (("eq", "id", int(del_cerrado["id"].iat[1])),))
+        self.backend.insertar(tablaTareas, {"nombre": "nueva", "estado": "Pendiente", "link_okr": int(cerrados.iat[0])})
+
+        df, marca = cache_disco.leer_tabla(tablaTareas)
+        caliente, marca = sincronizar_tabla(df, tablaTareas, marca)
+        completa = _completa(tablaTareas)
+        pd.testing.assert_frame_equal(caliente, _ordenada(completa), check_categorical=False)
+
+        # Guardado de nuevo, la partición del año cerrado se reescribe
+        cache_disco.guardar_tablas({tablaTareas: caliente}, {tablaTareas: marca}, okrs)
+        df, _ = cache_disco.leer_tabla(tablaTareas)
+        pd.testing.assert_frame_equal(df, _ordenada(completa), check_categorical=False)
+
+    def test_progreso_en_disco_corrupto(self):
+        snapshot = Snapshot(1, self.tablas, self.marcas)
+        snapshot.agregados
+        with open(os.path.join(cache_disco.DIR_CACHE, "progreso", f"anio={min(ANIOS)}.parquet"), "wb") as f:
+            f.write(b"no es parquet")
+        agregados = Snapshot(2, self.tablas, self.marcas).agregados
+        esperado = AgregadosProgreso.desde_tablas(self.tablas[tablaOkrs], self.tablas[tablaTareas])
+        for id_okr in self.tablas[tablaOkrs]["id"].tolist():
+            self.assertAlmostEqual(agregados.progreso_okr(id_okr), esperado.progreso_okr(id_okr))
+
+    def test_sin_directorio_no_hace_nada(self):
+        with mock.patch.object(cache_disco, "DIR_CACHE", None):
+            self.assertIsNone(cache_disco.leer_tabla(tablaTareas))
+
+
+if __name__ == "__main__":
+    unittest.main()
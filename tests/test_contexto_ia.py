@@ -0,0 +1,30 @@
+import unittest
+import pandas as pd
+from benchmarks.datos import ANIOS, generar
+from contexto_ia import construir_contexto
+from db import aplicar_esquema
+from okr_store import OkrStore
+from variables import tablaAreas, tablaEmpleados, tablaOkrs, tablaTareas
+
+# --- CONTEXTO DEL ASISTENTE ---
+# Tablas tipadas como en el snapshot: "anio" es categórica sin orden.
+
+class TestConstruirContexto(unittest.TestCase):
+    def setUp(self):
+        datos = generar(20, semilla=5)
+        self.store = OkrStore(*(aplicar_esquema(t, pd.DataFrame(datos[t]))
+                                for t in (tablaEmpleados, tablaOkrs, tablaTareas, tablaAreas)))
+        personales = self.store.okrs[self.store.okrs["tipo"] == "Empleado"]
+        self.id_empleado = int(personales["id_empleado"].iat[0])
+
+    def test_anio_sin_okrs_usa_el_mas_reciente(self):
+        texto = construir_contexto(self.store, self.id_empleado, anio=2030)
+        self.assertTrue(texto.startswith(f"Año {max(ANIOS)}:"), texto)
+
+    def test_anio_con_okrs(self):
+        texto = construir_contexto(self.store, self.id_empleado, anio=min(ANIOS))
+        self.assertTrue(texto.startswith(f"Año {min(ANIOS)}:"), texto)
+
+
+if __name__ == "__main__":
+    unittest.main()
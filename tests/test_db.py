@@ -0,0 +1,130 @@
+import unittest
+from unittest import mock
+import pandas as pd
+import db
+from backends import SqliteBackend
+from benchmarks.datos import generar
+from db import aplicar_delta, aplicar_esquema, concat_tabla
+from variables import tablaTareas
+
+# --- DELTAS LOCALES ---
+# aplicar_delta solo tipa la fila nueva: el resultado debe ser igual que tipar
+# la tabla entera (lo que hacía antes con concat_tabla).
+
+class TestAplicarDelta(unittest.TestCase):
+    def setUp(self):
+        self.tareas = aplicar_esquema(tablaTareas, pd.DataFrame(generar(50, semilla=3)[tablaTareas]))
+
+    def _igual_que_retipar(self, resultado, pos, fila):
+        nueva = {**(self.tareas.iloc[pos].to_dict() if pos < len(self.tareas) else {}), **fila}
+        esperado = concat_tabla(tablaTareas, [self.tareas.iloc[:pos], pd.DataFrame([nueva]).reindex(columns=self.tareas.columns),
+                                              self.tareas.iloc[pos + 1:]])
+        pd.testing.assert_frame_equal(resultado, esperado, check_categorical=False, check_dtype=False)
+
+    def test_actualiza_en_su_sitio(self):
+        id_tarea = int(self.tareas["id"].iat[10])
+        fila = {"id": id_tarea, "estado": "Hecho", "updated_at": "2026-10-18T10:00:00.5+00:00"}
+        resultado = aplicar_delta(self.tareas, tablaTareas, "upsert", fila)
+        self.assertEqual(len(resultado), len(self.tareas))
+        self.assertEqual(resultado["estado"].iat[10], "Hecho")
+        self.assertEqual(resultado["nombre"].iat[10], self.tareas["nombre"].iat[10])
+        self.assertEqual(dict(resultado.dtypes), dict(self.tareas.dtypes))
+        self._igual_que_retipar(resultado, 10, fila)
+
+    def test_inserta_con_categoria_nueva_y_id_en_texto(self):
+        fila = {"id": 10**6, "nombre": "nueva", "estado": "Bloqueada", "link_okr": "12"}
+        resultado = aplicar_delta(self.tareas, tablaTareas, "upsert", fila)
+        ultima = resultado.iloc[-1]
+        self.assertEqual((ultima["id"], ultima["estado"], ultima["link_okr"]), (10**6, "Bloqueada", 12))
+        self.assertIsInstance(resultado["estado"].dtype, pd.CategoricalDtype)
+        self.assertNotIn("Bloqueada", self.tareas["estado"].cat.categories)
+        self._igual_que_retipar(resultado, len(self.tareas), fila)
+
+    def test_borra(self):
+        id_tarea = int(self.tareas["id"].iat[0])
+        resultado = aplicar_delta(self.tareas, tablaTareas, "delete", {"id": id_tarea})
+        self.assertEqual(len(resultado), len(self.tareas) - 1)
+        self.assertNotIn(id_tarea, resultado["id"].tolist())
+
+
+
+# --- GUARDADO INDIVIDUAL ---
+# Lo que devuelven las escrituras se publica en el snapshot: sin fila devuelta
+# tiene que ser False, nunca el dict de entrada (una fila sin id).
+
+class SinRepresentacion(SqliteBackend):
+    def insertar(self, tabla, filas):
+        super().insertar(tabla, filas)
+        return []
+
+
+class TestGuardado(unittest.TestCase):
+    def _con_backend(self, backend):
+        parche = mock.patch.object(db, "get_backend", lambda: backend)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_insert_devuelve_la_fila_con_id(self):
+        self._con_backend(SqliteBackend())
+        fila = db.save_tarea({"nombre": "t", "estado": "Pendiente", "link_okr": 1})
+        self.assertIsNotNone(fila["id"])
+
+    def test_insert_sin_fila_devuelta_no_inventa_nada(self):
+        self._con_backend(SinRepresentacion())
+        self.assertIs(db.save_tarea({"nombre": "t", "estado": "Pendiente", "link_okr": 1}), False)
+
+    def test_update_y_delete_de_fila_inexistente(self):
+        self._con_backend(SqliteBackend())
+        self.assertIs(db.update_tarea(999, {"estado": "Hecho"}), False)
+        self.assertIs(db.delete_tarea(999), False)
+
+
+# --- EDICIONES DEL DATA_EDITOR ---
+# Solo se envían las columnas cambiadas, un update().in_() por cada grupo de
+# filas con los mismos cambios.
+
+class ContandoActualizar(SqliteBackend):
+    def __init__(self):
+        super().__init__()
+        self.actualizaciones = []
+
+    def actualizar(self, tabla, datos, filtros):
+        self.actualizaciones.append(datos)
+        return super().actualizar(tabla, datos, filtros)
+
+
+class TestEditor(unittest.TestCase):
+    def setUp(self):
+        self.backend = ContandoActualizar()
+        self.backend.insertar(tablaTareas, [{"nombre": f"t{i}", "estado": "Pendiente", "link_okr": 1} for i in range(4)])
+        parche = mock.patch.object(db, "get_backend", lambda: self.backend)
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.original = aplicar_esquema(tablaTareas, pd.DataFrame(self.backend.leer(tablaTareas)))
+
+    def _filas(self):
+        return {f["id"]: f for f in self.backend.leer(tablaTareas)}
+
+    def test_agrupa_cambios_iguales(self):
+        cambios = {"edited_rows": {0: {"estado": "Hecho"}, 1: {"estado": "Hecho"}, 2: {"nombre": "otra"}}}
+        resultado = db.update_database_from_editor(tablaTareas, cambios, original=self.original)
+        self.assertEqual((resultado["ok"], resultado["errores"]), (3, []))
+        self.assertEqual(self.backend.actualizaciones, [{"estado": "Hecho"}, {"nombre": "otra"}])
+        filas = self._filas()
+        self.assertEqual([filas[i]["estado"] for i in (1, 2, 3)], ["Hecho", "Hecho", "Pendiente"])
+        self.assertEqual(filas[3]["nombre"], "otra")
+
+    def test_no_resucita_ni_pisa_cambios_concurrentes(self):
+        # Mientras el editor estaba abierto otro usuario borró la fila 1 y
+        # cambió el nombre de la 2
+        self.backend.borrar(tablaTareas, (("eq", "id", 1),))
+        self.backend.actualizar(tablaTareas, {"nombre": "de otro"}, (("eq", "id", 2),))
+        cambios = {"edited_rows": {0: {"estado": "Hecho"}, 1: {"estado": "Hecho"}}}
+        db.update_database_from_editor(tablaTareas, cambios, original=self.original)
+        filas = self._filas()
+        self.assertNotIn(1, filas)
+        self.assertEqual((filas[2]["nombre"], filas[2]["estado"]), ("de otro", "Hecho"))
+
+
+if __name__ == "__main__":
+    unittest.main()
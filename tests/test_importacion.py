@@ -0,0 +1,126 @@
+import io
+import unittest
+from unittest import mock
+import pandas as pd
+import db
+from auth import verificar_password
+from backends import SqliteBackend
+from importacion import Importacion, leer_archivo
+from variables import tablaAreas, tablaEmpleados, tablaOkrs, tablaTareas
+
+# --- IMPORTACIÓN MASIVA ---
+# Contra un SQLite en memoria. Los números de fila de los errores son los del
+# fichero: la cabecera es la fila 1.
+
+AREAS = "nombre\nVentas\nIT\nventas\n"
+EMPLEADOS = """nombre;email;password;rol;area
+Ana;ana@x.com;Temporal1;manager;Ventas
+Luis;luis@x.com;Temporal1;;it
+Eva;eva@x.com;Temporal1;;Marketing
+Otro;ana@x.com;Temporal1;;IT
+Sin email;no-es-email;Temporal1;;IT
+"""
+# El personal enlaza por nombre con un corporativo que viene después
+OKRS = """nombre,descripcion,tipo,email,link_org,anio,estado
+Vender más,,Empleado,ana@x.com,Crecer,2026,
+Crecer,,Organizacion,,,2026,En curso
+Huérfano,,Empleado,nadie@x.com,,2026,
+Mal enlazado,,Empleado,luis@x.com,No existe,2026,
+"""
+TAREAS = """nombre,estado,link_okr,email
+Llamar clientes,Hecho,Vender más,
+Ayudar,,Vender más,luis@x.com
+Sin OKR,,No existe,
+Estado raro,Volando,Vender más,
+"""
+
+
+def _csv(texto):
+    return io.BytesIO(texto.encode())
+
+
+class TestImportacion(unittest.TestCase):
+    def setUp(self):
+        self.backend = SqliteBackend()
+        parche = mock.patch.object(db, "get_backend", lambda: self.backend)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def _importar(self, importacion, tabla, texto):
+        (tabla, filas, total), = leer_archivo(_csv(texto), f"{tabla}.csv", tabla)
+        return importacion.importar(tabla, filas, total)
+
+    def _filas(self, tabla):
+        return {f["nombre"]: f for f in self.backend.leer(tabla)}
+
+    def test_organizacion_en_csv(self):
+        importacion = Importacion({})
+        areas = self._importar(importacion, tablaAreas, AREAS)
+        self.assertEqual(areas["ok"], 2)
+        self.assertEqual(areas["errores"], [(4, "El área 'ventas' ya existe")])
+
+        empleados = self._importar(importacion, tablaEmpleados, EMPLEADOS)
+        self.assertEqual(empleados["ok"], 2)
+        self.assertEqual([n for n, _ in empleados["errores"]], [4, 5, 6])
+        self.assertIn("Área desconocida", empleados["errores"][0][1])
+        self.assertIn("ya está registrado", empleados["errores"][1][1])
+        self.assertIn("Email no válido", empleados["errores"][2][1])
+        filas = self._filas(tablaEmpleados)
+        self.assertEqual((filas["Luis"]["rol"], filas["Luis"]["area"]), ("empleado", "IT"))
+        self.assertTrue(verificar_password("Temporal1", filas["Ana"]["password"]))
+
+        okrs = self._importar(importacion, tablaOkrs, OKRS)
+        self.assertEqual(okrs["ok"], 2)
+        self.assertEqual([n for n, _ in okrs["errores"]], [4, 5])
+        self.assertIn("Empleado desconocido", okrs["errores"][0][1])
+        self.assertIn("no hay ningún OKR 'No existe'", okrs["errores"][1][1])
+        okrs = self._filas(tablaOkrs)
+        personal = okrs["Vender más"]
+        self.assertEqual(personal["link_org"], okrs["Crecer"]["id"])
+        self.assertEqual(personal["id_empleado"], filas["Ana"]["id"])
+
+        tareas = self._importar(importacion, tablaTareas, TAREAS)
+        self.assertEqual(tareas["ok"], 2)
+        self.assertEqual([n for n, _ in tareas["errores"]], [4, 5])
+        self.assertIn("Estado 'Volando' no válido", tareas["errores"][1][1])
+        tareas = self._filas(tablaTareas)
+        self.assertEqual(tareas["Llamar clientes"]["link_okr"], personal["id"])
+        # Sin email la tarea es del dueño del OKR
+        self.assertEqual(tareas["Llamar clientes"]["id_empleado"], filas["Ana"]["id"])
+        self.assertEqual(tareas["Ayudar"]["id_empleado"], filas["Luis"]["id"])
+
+    def test_claves_contra_el_snapshot_y_por_id(self):
+        self.backend.insertar(tablaAreas, {"nombre": "IT"})
+        self.backend.insertar(tablaEmpleados, {"nombre": "Ana", "email": "ana@x.com", "password": "h", "area": "IT"})
+        okr, = self.backend.insertar(tablaOkrs, {"nombre": "Crecer", "tipo": "Organizacion", "anio": 2026})
+        tablas = {t: pd.DataFrame(self.backend.leer(t)) for t in (tablaAreas, tablaEmpleados, tablaOkrs)}
+        importacion = Importacion(tablas)
+        resultado = self._importar(importacion, tablaTareas, f"nombre,link_okr,email\nPor id,{okr['id']},ana@x.com\nId malo,999,\n")
+        self.assertEqual(resultado["ok"], 1)
+        self.assertEqual(resultado["errores"], [(3, "link_okr: no existe el OKR 999")])
+        self.assertEqual(self._filas(tablaTareas)["Por id"]["link_okr"], okr["id"])
+
+    def test_faltan_columnas(self):
+        resultado = self._importar(Importacion({}), tablaEmpleados, "nombre,email\nAna,ana@x.com\n")
+        self.assertEqual(resultado, {"ok": 0, "errores": [(1, "Faltan columnas: password, area")]})
+        self.assertEqual(self.backend.leer(tablaEmpleados), [])
+
+    def test_xlsx_en_orden_de_importacion(self):
+        # Hojas en cualquier orden: se importan áreas, empleados, OKRs y tareas
+        libro = io.BytesIO()
+        with pd.ExcelWriter(libro) as escritor:
+            pd.read_csv(_csv(TAREAS)).to_excel(escritor, sheet_name="tareas", index=False)
+            pd.read_csv(_csv(OKRS)).to_excel(escritor, sheet_name="okrs", index=False)
+            pd.read_csv(_csv(EMPLEADOS), sep=";").to_excel(escritor, sheet_name="Empleados", index=False)
+            pd.read_csv(_csv(AREAS)).to_excel(escritor, sheet_name="areas", index=False)
+        importacion = Importacion({})
+        resultados = {tabla: importacion.importar(tabla, filas, total)
+                      for tabla, filas, total in leer_archivo(libro, "org.xlsx")}
+        self.assertEqual(list(resultados), [tablaAreas, tablaEmpleados, tablaOkrs, tablaTareas])
+        self.assertEqual([r["ok"] for r in resultados.values()], [2, 2, 2, 2])
+        self.assertEqual([n for n, _ in resultados[tablaTareas]["errores"]], [4, 5])
+        self.assertEqual(self._filas(tablaOkrs)["Vender más"]["anio"], 2026)
+
+
+if __name__ == "__main__":
+    unittest.main()
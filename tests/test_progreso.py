@@ -0,0 +1,107 @@
+import random
+import unittest
+from unittest import mock
+import pandas as pd
+import progreso
+from benchmarks.datos import ANIOS, ESTADOS_TAREA, generar
+from db import aplicar_delta, aplicar_esquema
+from progreso import AgregadosProgreso, progreso_por_okr
+from variables import tablaOkrs, tablaTareas
+
+# --- AGREGADOS INCREMENTALES ---
+# Deltas aleatorios aplicados con AgregadosProgreso.con() contra el recálculo
+# completo (desde_tablas) sobre las mismas tablas, mantenidas con aplicar_delta
+# como hace snapshot.publicar. Las filas llevan link_okr en texto, como Supabase.
+DELTAS = 300
+
+def _estado(agregados, okrs):
+    """Todo lo que leen las vistas, en tipos comparables."""
+    corporativos = okrs.loc[okrs["tipo"] == "Organizacion", "id"].tolist()
+    return {
+        "okrs": {i: round(agregados.progreso_okr(i), 9) for i in okrs["id"].tolist()},
+        "equipo": {a: agregados.progreso_equipo(a).round(9).sort_index().to_dict() for a in ANIOS},
+        "rollup": {i: {k: round(v, 9) for k, v in agregados.rollup_corporativo(i).items()} for i in corporativos},
+    }
+
+
+class TestAgregadosProgreso(unittest.TestCase):
+    def setUp(self):
+        datos = generar(200, semilla=7)
+        self.okrs = aplicar_esquema(tablaOkrs, pd.DataFrame(datos[tablaOkrs]))
+        self.tareas = aplicar_esquema(tablaTareas, pd.DataFrame(datos[tablaTareas]))
+        self.rnd = random.Random(7)
+
+    def _delta(self, k):
+        """(tabla, accion, fila) al azar sobre las tablas actuales."""
+        ids_okr = self.okrs["id"].tolist()
+        ids_tarea = self.tareas["id"].tolist()
+        personales = self.okrs.loc[self.okrs["tipo"] == "Empleado", "id"].tolist()
+        corporativos = self.okrs.loc[self.okrs["tipo"] == "Organizacion", "id"].tolist()
+        op = self.rnd.random()
+        if op < 0.35:
+            return tablaTareas, "upsert", {"id": self.rnd.choice(ids_tarea), "estado": self.rnd.choice(ESTADOS_TAREA)}
+        if op < 0.5:
+            return tablaTareas, "delete", {"id": self.rnd.choice(ids_tarea)}
+        if op < 0.7:
+            return tablaTareas, "upsert", {"id": 10**6 + k, "nombre": "nueva", "estado": self.rnd.choice(ESTADOS_TAREA),
+                                           "link_okr": str(self.rnd.choice(ids_okr)), "id_empleado": 2}
+        if op < 0.8:
+            return tablaTareas, "upsert", {"id": self.rnd.choice(ids_tarea), "link_okr": str(self.rnd.choice(ids_okr))}
+        if op < 0.88:
+            return tablaOkrs, "upsert", {"id": 10**6 + k, "nombre": "nuevo", "tipo": "Empleado",
+                                         "id_empleado": self.rnd.randrange(2, 200), "anio": self.rnd.choice(ANIOS),
+                                         "estado": "Nuevo", "link_org": self.rnd.choice(corporativos)}
+        if op < 0.95:
+            return tablaOkrs, "upsert", {"id": self.rnd.choice(personales), "id_empleado": self.rnd.randrange(2, 200),
+                                         "link_org": self.rnd.choice(corporativos + [None])}
+        return tablaOkrs, "delete", {"id": self.rnd.choice(personales)}
+
+    def test_deltas_igual_que_recalcular(self):
+        agregados = AgregadosProgreso.desde_tablas(self.okrs, self.tareas)
+        for k in range(DELTAS):
+            tabla, accion, fila = self._delta(k)
+            agregados = (agregados.con(tabla, borrados=[fila["id"]]) if accion == "delete"
+                         else agregados.con(tabla, [fila]))
+            if tabla == tablaOkrs:
+                self.okrs = aplicar_delta(self.okrs, tabla, accion, fila)
+            else:
+                self.tareas = aplicar_delta(self.tareas, tabla, accion, fila)
+        esperado = AgregadosProgreso.desde_tablas(self.okrs, self.tareas)
+        self.assertEqual(_estado(agregados, self.okrs), _estado(esperado, self.okrs))
+
+    def test_link_okr_en_texto(self):
+        agregados = AgregadosProgreso.desde_tablas(self.okrs, self.tareas)
+        tarea = self.tareas.iloc[0]
+        id_okr = int(tarea["link_okr"])
+        nuevo = agregados.con(tablaTareas, [{"id": int(tarea["id"]), "link_okr": str(id_okr), "estado": "Hecho"}])
+        self.tareas = aplicar_delta(self.tareas, tablaTareas, "upsert", {"id": tarea["id"], "estado": "Hecho"})
+        esperado = progreso_por_okr(self.okrs[self.okrs["id"] == id_okr], self.tareas)["progreso"].iloc[0]
+        self.assertAlmostEqual(nuevo.progreso_okr(id_okr), esperado)
+        self.assertNotIn(str(id_okr), nuevo.conteos)
+
+    def test_con_no_modifica_la_version_anterior(self):
+        agregados = AgregadosProgreso.desde_tablas(self.okrs, self.tareas)
+        antes = _estado(agregados, self.okrs)
+        for k in range(50):
+            tabla, accion, fila = self._delta(k)
+            (agregados.con(tabla, borrados=[fila["id"]]) if accion == "delete" else agregados.con(tabla, [fila]))
+        self.assertEqual(_estado(agregados, self.okrs), antes)
+
+
+    def test_compactacion_no_cambia_nada(self):
+        # Con COMPACTAR pequeño las _Capas se aplanan varias veces por el camino;
+        # una versión intermedia tiene que seguir igual después
+        with mock.patch.object(progreso, "COMPACTAR", 10):
+            agregados = AgregadosProgreso.desde_tablas(self.okrs, self.tareas)
+            for k in range(40):
+                tabla, accion, fila = self._delta(k)
+                agregados = (agregados.con(tabla, borrados=[fila["id"]]) if accion == "delete"
+                             else agregados.con(tabla, [fila]))
+            intermedia, okrs_intermedia = agregados, self.okrs
+            antes = _estado(intermedia, okrs_intermedia)
+            self.test_deltas_igual_que_recalcular()
+        self.assertEqual(_estado(intermedia, okrs_intermedia), antes)
+
+
+if __name__ == "__main__":
+    unittest.main()
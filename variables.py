@@ -10,4 +10,17 @@ connectionGeneral="gsheets"
 tablaAreas="areas"
 tablaEmpleados="empleados"
 tablaOkrs="okrs"
-tablaTareas="tareas"
\ No newline at end of file
+tablaTareas="tareas"
+tablaEliminados="eliminados"
+
+# --- PROYECCIONES DE COLUMNAS ---
+# Lo que se pide a Supabase para cada tabla. Nunca "*": así no viajan la
+# password ni columnas que ninguna vista usa.
+columnasEmpleados="id, nombre, email, rol, area, updated_at"
+columnasCredenciales="id, nombre, email, password, rol, area"
+columnasOkrs="id, nombre, descripcion, tipo, id_empleado, link_org, anio, estado, updated_at"
+columnasTareas="id, nombre, estado, link_okr, id_empleado, updated_at"
+columnasAreas="id, nombre, updated_at"
+
+# Puntos que aporta cada estado de tarea al progreso de su OKR
+puntosEstadoTarea={"Hecho": 1.0, "Haciendo": 0.5, "Pendiente": 0.0}